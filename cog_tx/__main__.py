@@ -1,19 +1,43 @@
+import json
 import signal
 import sys
-from PyQt5 import QtWidgets
+
+from cog_tx import startup
+from PyQt5 import QtCore, QtWidgets
+startup.mark('qt_import')
 
 from cog_tx.version import __version__
 from cog_tx.ui_classes.cog_tx_main_window import CogTransmit_MainWindow
+startup.mark('window_import')
+
+def exit_after_preload(window, timer):
+
+    # --startup-json (benchmark): phases as one JSON line, then close once the background load is done
+    if window.preload_thread.is_alive():
+        return
+
+    timer.stop()
+    print(json.dumps({'start_time': startup.start_time, 'phases': startup.phases}))
+    window.close()
 
 def main():
     try:
+        startup.verbose = '--startup-report' in sys.argv
+
         app = QtWidgets.QApplication(sys.argv)
         app.setOrganizationName("VT")
         app.setOrganizationDomain("www.vt.edu")
         app.setApplicationName("Cogswill Tx App")
         app.setApplicationVersion(__version__)
 
+        # window is shown before GNU Radio / UHD are loaded, those load in the background
         CogTransmit_MainWindow.window = CogTransmit_MainWindow()
+        startup.mark('window_shown')
+
+        if '--startup-json' in sys.argv:
+            timer = QtCore.QTimer()
+            timer.timeout.connect(lambda: exit_after_preload(CogTransmit_MainWindow.window, timer))
+            timer.start(10)
 
         sys.exit(app.exec_())
 
@@ -0,0 +1,248 @@
+from __future__ import print_function    # (at top of module)
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from timeit import default_timer as timer
+
+import numpy as np
+
+from cog_tx.version import __version__
+from cog_tx.mem_manager.shmem import shm_mem
+
+
+"""
+Benchmark harness for the generation chain. Run with
+
+    python -m cog_tx.benchmark [--quick] [--only shm_vectors,np_modulators] [--output bench_output.json]
+
+Every measurement is a record {suite, name, params, value, unit}; the whole run is written as one JSON
+document together with the version and host details so results can be diffed between versions.
+Suites needing GNU Radio or Qt are skipped (and recorded as skipped) when those are not installed.
+"""
+
+bench_channel_id = 9999
+
+
+def record(suite, name, value, unit, **params):
+    return {'suite': suite, 'name': name, 'params': params, 'value': value, 'unit': unit}
+
+
+def best_of(fn, repeat, setup=None):
+    '''
+    :param setup: called before each call to fn, outside the timed region
+    :return: fastest wall time of repeat calls to fn, in seconds
+    '''
+    best = float('inf')
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        start = timer()
+        fn()
+        best = min(best, timer() - start)
+    return best
+
+
+# --- suites --- #
+
+def bench_np_modulators(quick):
+    from cog_tx.siggen import np_modulations
+
+    n_bytes = 1 << (14 if quick else 18)
+    data = np.random.randint(0, 256, n_bytes).astype(np.uint8)
+    results = []
+
+    for name in np_modulations.modulators:
+        for sps in (2, 4, 8):
+            for excess_bw in (0.2, 0.35, 0.5):
+                samples = np_modulations.modulate(name, data, sps, excess_bw)
+                seconds = best_of(lambda: np_modulations.modulate(name, data, sps, excess_bw), 1 if quick else 3)
+                results.append(record('np_modulators', name, len(samples) / seconds, 'samples/s', sps=sps, excess_bw=excess_bw))
+
+    return results
+
+
+def bench_gr_modulators(quick):
+    from gnuradio import gr, blocks
+    from cog_tx.siggen import modulations
+
+    n_samples = 1 << (18 if quick else 22)
+    data = [int(b) for b in np.random.randint(0, 256, 4096)]
+    results = []
+
+    for name, spec in modulations.registry.items():
+        if spec.mod_type != 'discrete' or name == 'PI4QPSK':
+            continue
+        for sps in (2, 4, 8):
+            for excess_bw in (0.2, 0.35, 0.5):
+                tb = gr.top_block()
+                tb.connect(blocks.vector_source_b(data, True), modulations.make(name, sps, excess_bw),
+                           blocks.head(gr.sizeof_gr_complex, n_samples), blocks.null_sink(gr.sizeof_gr_complex))
+                seconds = best_of(tb.run, 1)
+                results.append(record('gr_modulators', name, n_samples / seconds, 'samples/s', sps=sps, excess_bw=excess_bw))
+
+    return results
+
+
+def bench_flowgraph_build(quick):
+    from cog_tx.siggen.tx_signal import transmit
+
+    cbp = shm_mem(bench_channel_id, write_permissions=True, buffer_size=16 * 1024 * 1024)
+    results = []
+
+    try:
+        for name in ('BPSK', 'QPSK', 'QAM16', 'GMSK'):
+            build = lambda: transmit(cbp, 1, 900e6, 200e3, name, 10, 200000, _sink_type='null')
+            seconds = best_of(build, 1 if quick else 5)
+            results.append(record('flowgraph_build', name, seconds * 1e3, 'ms'))
+    finally:
+        os.remove(cbp.path + str(bench_channel_id))
+
+    return results
+
+
+def bench_shm_headers(quick):
+    cbp = shm_mem(bench_channel_id, write_permissions=True, buffer_size=16 * 1024 * 1024)
+    n = 1000 if quick else 20000
+    results = []
+
+    try:
+        cbp.write_channel_header(center_frequency_hz=900e6, sample_rate_hz=400e3)
+
+        seconds = best_of(lambda: [cbp.write_channel_header(center_frequency_hz=900e6, sample_rate_hz=400e3) for i in range(n)], 3)
+        results.append(record('shm_headers', 'write_channel_header', n / seconds, 'headers/s'))
+
+        seconds = best_of(lambda: [cbp.read_channel_header() for i in range(n)], 3)
+        results.append(record('shm_headers', 'read_channel_header', n / seconds, 'headers/s'))
+
+        def write_frames():
+            # ids cycle through the frame table, each rewrite replaces its slot
+            for i in range(n):
+                cbp.write_frame_header(i % cbp.frame_table_entries, 0, 'b', 1.0, 0)
+
+        seconds = best_of(write_frames, 3, setup=lambda: cbp.write_channel_header(center_frequency_hz=900e6, sample_rate_hz=400e3))
+        results.append(record('shm_headers', 'write_frame_header', n / seconds, 'headers/s'))
+
+        index = cbp.data_start_index
+        seconds = best_of(lambda: [cbp.read_frame_header(index) for i in range(n)], 3)
+        results.append(record('shm_headers', 'read_frame_header', n / seconds, 'headers/s'))
+
+        seconds = best_of(cbp.read_frame_headers, 3)
+        results.append(record('shm_headers', 'read_frame_headers', cbp.frame_table_entries / seconds, 'headers/s'))
+    finally:
+        os.remove(cbp.path + str(bench_channel_id))
+
+    return results
+
+
+def bench_shm_vectors(quick):
+    sizes = [1 << k for k in range(10, 21 if quick else 25, 2)]
+    cbp = shm_mem(bench_channel_id, write_permissions=True, buffer_size=4 * sizes[-1] + 1024 * 1024)
+    results = []
+
+    try:
+        for dtype, write, read in ((np.int32, cbp.write_int32_vector, cbp.read_int32_vector),
+                                   (np.float32, cbp.write_f32_vector, cbp.read_f32_vector)):
+            for size in sizes:
+                vector = np.arange(size).astype(dtype)
+
+                # header rewrite only rewinds the active pointer, it is not part of the vector write
+                seconds = best_of(lambda: write(vector), 3, setup=lambda: cbp.write_channel_header(center_frequency_hz=900e6, sample_rate_hz=400e3))
+                results.append(record('shm_vectors', 'write_' + np.dtype(dtype).name, vector.nbytes / seconds / 1e6, 'MB/s', elements=size))
+
+                # readers are zero-copy views, so time a full pass over the data as well
+                seconds = best_of(lambda: read(size, cbp.data_start_index).sum(), 3)
+                results.append(record('shm_vectors', 'read_' + np.dtype(dtype).name, vector.nbytes / seconds / 1e6, 'MB/s', elements=size))
+    finally:
+        os.remove(cbp.path + str(bench_channel_id))
+
+    return results
+
+
+def bench_startup(quick):
+    # the real entry point in a fresh interpreter each run (python -m cog_tx --startup-json prints its
+    # startup phases and exits once the background GNU Radio load is done): time from launching the
+    # process to the main window being shown, plus the phases the app marks itself
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(os.path.dirname(os.path.abspath(__file__)))] +
+                                        ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+
+    runs = []
+    for i in range(1 if quick else 3):
+        launched = time.time()
+        output = subprocess.check_output([sys.executable, '-m', 'cog_tx', '--startup-json'], env=env)
+        run = json.loads([line for line in output.decode().splitlines() if line.startswith('{')][-1])
+        run['interpreter_start'] = run['start_time'] - launched
+        run['shown'] = run['interpreter_start'] + dict(run['phases'])['window_shown']
+        runs.append(run)
+
+    best = min(runs, key=lambda run: run['shown'])
+    results = [record('startup', 'main_window_shown', best['shown'] * 1e3, 'ms'),
+               record('startup', 'interpreter_start', best['interpreter_start'] * 1e3, 'ms')]
+    for phase, seconds in best['phases']:
+        results.append(record('startup', phase, seconds * 1e3, 'ms'))
+
+    return results
+
+
+suites = [
+    ('np_modulators', bench_np_modulators),
+    ('gr_modulators', bench_gr_modulators),
+    ('flowgraph_build', bench_flowgraph_build),
+    ('shm_headers', bench_shm_headers),
+    ('shm_vectors', bench_shm_vectors),
+    ('startup', bench_startup),
+]
+
+
+def run(only=None, quick=False):
+
+    report = {
+        'version': __version__,
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'numpy': np.__version__,
+        'results': [],
+        'skipped': {},
+    }
+
+    for name, suite in suites:
+        if only and name not in only:
+            continue
+
+        print('Running ' + name)
+        try:
+            report['results'].extend(suite(quick))
+        except (ImportError, subprocess.CalledProcessError) as e:
+            print('---- skipped: ' + str(e))
+            report['skipped'][name] = str(e)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cogswill Tx benchmarks')
+    parser.add_argument('--output', default='bench_output.json', help='JSON results file')
+    parser.add_argument('--only', default=None, help='comma separated suite names')
+    parser.add_argument('--quick', action='store_true', help='smaller sizes and fewer repeats')
+    args = parser.parse_args()
+
+    report = run(only=args.only.split(',') if args.only else None, quick=args.quick)
+
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+
+    for r in report['results']:
+        print('{suite:>16} {name:>20} {value:14.1f} {unit:10} {params}'.format(**r))
+
+    print('Results written to ' + args.output)
+
+
+if __name__ == "__main__":
+    main()
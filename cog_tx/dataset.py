@@ -0,0 +1,269 @@
+from __future__ import print_function    # (at top of module)
+
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from cog_tx.version import __version__
+from cog_tx.siggen import np_modulations
+from cog_tx.siggen import np_channel_model
+
+
+"""
+Headless labelled IQ dataset generation. Run with
+
+    python -m cog_tx.dataset --output dataset [--spec sweep.json] [--modulations BPSK,QPSK] [--esn0 0,10,20]
+                             [--sps 2,4] [--excess-bw 0.35] [--count 1000] [--length 1024] [--workers N]
+
+The sweep is every modulation x Es/N0 x sps x excess_bw combination, count examples each. The examples
+are split into one shard per worker process; each worker preallocates its own memory-mapped
+shard-NNN.iq.npy (complex64, examples x length) and shard-NNN.labels.npy (one label_dtype record per
+example) and fills them in blocks. index.json lists the shards, the spec and the modulation names the
+labels' modulation field indexes into.
+
+Samples come from the NumPy modulators and channel model, no GNU Radio or radio is needed.
+"""
+
+default_spec = {
+    'modulations': sorted(np_modulations.modulators),
+    'esn0_dB': list(range(-10, 21, 2)),
+    'sps': [2, 4, 8],
+    'excess_bw': [0.35],
+    'count': 1000,              # examples per combination
+    'length': 1024,             # samples per example
+    'sample_rate_hz': 1e6,
+    'cfo_hz': 0.0,              # examples get a uniform random offset in [-cfo_hz, cfo_hz]
+    'phase_noise_rad': 0.0,
+    'sro_ppm': 0.0,
+    'taps': [1.0],
+    'seed': None,
+}
+
+label_dtype = np.dtype([
+    ('modulation', np.uint8),   # index into index.json 'modulations'
+    ('esn0_dB', np.float32),
+    ('sps', np.uint8),
+    ('excess_bw', np.float32),
+    ('cfo_hz', np.float32),
+])
+
+# examples generated per vectorised call, bounds worker memory
+block_examples = 1024
+
+
+def sweep(spec):
+    '''
+    :return: (modulation index, esn0_dB, sps, excess_bw) for every combination in the spec
+    '''
+    return list(itertools.product(range(len(spec['modulations'])), spec['esn0_dB'], spec['sps'], spec['excess_bw']))
+
+
+def shard_jobs(jobs, count, shards):
+    '''
+    Split jobs x count examples into contiguous, nearly equal shards
+    :return: per shard, a list of (job, number of examples)
+    '''
+    total = len(jobs) * count
+    bounds = [total * k // shards for k in range(shards + 1)]
+    result = []
+
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        parts = []
+        position = start
+        while position < stop:
+            job, offset = divmod(position, count)
+            n = min(count - offset, stop - position)
+            parts.append((jobs[job], n))
+            position += n
+        result.append(parts)
+
+    return result
+
+
+def samples_per_byte(modulation, sps):
+    # 15 bytes = 120 bits, a whole number of symbols for 1 to 6 bits per symbol
+    return len(np_modulations.modulate(modulation, np.zeros(15, dtype=np.uint8), sps)) / 15.0
+
+
+def generate(spec, job, n, rng):
+    '''
+    n examples of one combination: one continuous modulated stream cut into consecutive windows, then
+    impaired as a batch
+    :return: (iq n x length complex64, labels)
+    '''
+    modulation_index, esn0_dB, sps, excess_bw = job
+    modulation = spec['modulations'][modulation_index]
+    length = spec['length']
+
+    # with a sample-rate offset each window reads past its end: take the following samples too, trim after
+    margin = np_channel_model.sro_margin(length, spec['sro_ppm'])
+
+    # skip the pulse shaping filter's start up transient
+    skip = 11 * sps
+    n_bytes = int(math.ceil((n * length + margin + skip) / samples_per_byte(modulation, sps))) + 1
+
+    payload = np.frombuffer(rng.bytes(n_bytes), dtype=np.uint8)
+    stream = np_modulations.modulate(modulation, payload, sps, excess_bw)[skip:skip + n * length + margin]
+    iq = stream[np.arange(n)[:, np.newaxis] * length + np.arange(length + margin)]
+
+    cfo_hz = rng.uniform(-spec['cfo_hz'], spec['cfo_hz'], n) if spec['cfo_hz'] else np.zeros(n)
+    params = [np_channel_model.channel_params(esn0_dB, cfo, spec['phase_noise_rad'], spec['sro_ppm'], spec['taps']) for cfo in cfo_hz]
+    iq = np_channel_model.apply_bursts(iq, params, spec['sample_rate_hz'], sps, rng)[:, :length]
+
+    labels = np.empty(n, dtype=label_dtype)
+    labels['modulation'] = modulation_index
+    labels['esn0_dB'] = esn0_dB
+    labels['sps'] = sps
+    labels['excess_bw'] = excess_bw
+    labels['cfo_hz'] = cfo_hz
+
+    return iq, labels
+
+
+def shard_paths(output, shard):
+    name = os.path.join(output, 'shard-{0:03d}'.format(shard))
+    return name + '.iq.npy', name + '.labels.npy'
+
+
+def run_shard(task):
+    '''
+    Worker: preallocate this shard's files and fill them block by block
+    :return: (shard, number of examples)
+    '''
+    spec, output, shard, parts = task
+
+    seed = spec['seed']
+    rng = np.random.RandomState(None if seed is None else seed + shard)
+
+    total = sum(n for job, n in parts)
+    iq_path, labels_path = shard_paths(output, shard)
+    iq = np.lib.format.open_memmap(iq_path, mode='w+', dtype=np.complex64, shape=(total, spec['length']))
+    labels = np.lib.format.open_memmap(labels_path, mode='w+', dtype=label_dtype, shape=(total,))
+
+    position = 0
+    for job, n in parts:
+        for start in range(0, n, block_examples):
+            block = min(block_examples, n - start)
+            iq[position:position + block], labels[position:position + block] = generate(spec, job, block, rng)
+            position += block
+
+    iq.flush()
+    labels.flush()
+    del iq, labels
+
+    return shard, total
+
+
+def run(spec, output, workers=None):
+    '''
+    Generate the whole sweep into output, one shard per worker
+    :return: index (also written to output/index.json)
+    '''
+    workers = workers or multiprocessing.cpu_count()
+
+    assert all(m in np_modulations.modulators for m in spec['modulations']), \
+        'Supported modulations: ' + ', '.join(sorted(np_modulations.modulators))
+
+    if not os.path.isdir(output):
+        os.makedirs(output)
+
+    jobs = sweep(spec)
+    shards = shard_jobs(jobs, spec['count'], workers)
+    tasks = [(spec, output, k, parts) for k, parts in enumerate(shards)]
+
+    start_time = time.time()
+    done = 0
+    pool = multiprocessing.Pool(workers)
+    try:
+        for shard, n in pool.imap_unordered(run_shard, tasks):
+            done += n
+            print('---- [Shard {0:03d}] {1} examples, {2} / {3} done'.format(shard, n, done, len(jobs) * spec['count']))
+    finally:
+        pool.close()
+        pool.join()
+
+    elapsed = time.time() - start_time
+
+    index = {
+        'version': __version__,
+        'spec': spec,
+        'modulations': spec['modulations'],
+        'label_dtype': label_dtype.descr,
+        'examples': done,
+        'elapsed_s': elapsed,
+        'shards': [{'iq': os.path.basename(shard_paths(output, k)[0]),
+                    'labels': os.path.basename(shard_paths(output, k)[1]),
+                    'examples': sum(n for job, n in parts)} for k, parts in enumerate(shards)],
+    }
+
+    with open(os.path.join(output, 'index.json'), 'w') as index_file:
+        json.dump(index, index_file, indent=2)
+
+    return index
+
+
+def load(output):
+    '''
+    :return: (index, [(iq, labels) memory-mapped per shard])
+    '''
+    with open(os.path.join(output, 'index.json')) as index_file:
+        index = json.load(index_file)
+
+    shards = [(np.load(os.path.join(output, s['iq']), mmap_mode='r'), np.load(os.path.join(output, s['labels']), mmap_mode='r'))
+              for s in index['shards']]
+
+    return index, shards
+
+
+def number_list(text, convert=float):
+    return [convert(v) for v in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cogswill Tx dataset generation')
+    parser.add_argument('--output', required=True, help='output directory')
+    parser.add_argument('--spec', default=None, help='JSON sweep spec, keys as in default_spec')
+    parser.add_argument('--modulations', default=None, help='comma separated, e.g. BPSK,QPSK')
+    parser.add_argument('--esn0', default=None, help='comma separated Es/N0 values in dB')
+    parser.add_argument('--sps', default=None, help='comma separated samples per symbol')
+    parser.add_argument('--excess-bw', default=None, help='comma separated excess bandwidths')
+    parser.add_argument('--count', type=int, default=None, help='examples per combination')
+    parser.add_argument('--length', type=int, default=None, help='samples per example')
+    parser.add_argument('--seed', type=int, default=None, help='base seed, shard k uses seed + k')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, default all cores')
+    args = parser.parse_args()
+
+    spec = dict(default_spec)
+    if args.spec:
+        with open(args.spec) as spec_file:
+            spec.update(json.load(spec_file))
+
+    if args.modulations:
+        spec['modulations'] = args.modulations.split(',')
+    if args.esn0:
+        spec['esn0_dB'] = number_list(args.esn0)
+    if args.sps:
+        spec['sps'] = number_list(args.sps, int)
+    if args.excess_bw:
+        spec['excess_bw'] = number_list(args.excess_bw)
+    if args.count is not None:
+        spec['count'] = args.count
+    if args.length is not None:
+        spec['length'] = args.length
+    if args.seed is not None:
+        spec['seed'] = args.seed
+
+    index = run(spec, args.output, args.workers)
+
+    print('{0} examples in {1:.1f} s ({2:.0f} examples/s), written to {3}'.format(
+        index['examples'], index['elapsed_s'], index['examples'] / max(index['elapsed_s'], 1e-9), args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from __future__ import print_function    # (at top of module)
+
+import ctypes
+import ctypes.util
+import errno
+import platform
+
+"""
+Minimal cross-process futex wrappers (Linux). Used to park readers of a shared memory
+channel on a 32-bit word in the mapping until the writer publishes something new.
+"""
+
+# syscall numbers by architecture
+SYS_futex = {
+    'x86_64': 202,
+    'aarch64': 98,
+    'i386': 240,
+    'i686': 240,
+    'armv7l': 240,
+}.get(platform.machine())
+
+FUTEX_WAIT = 0
+FUTEX_WAKE = 1
+WAKE_ALL = 0x7fffffff
+
+
+class timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    _syscall = _libc.syscall
+except (OSError, AttributeError):
+    _syscall = None
+
+available = platform.system() == 'Linux' and SYS_futex is not None and _syscall is not None
+
+
+def wait(address, expected, timeout_s=None):
+    '''
+    Sleep while the uint32 at address still equals expected (shared, not process private)
+    :return: False on timeout, True when woken or the value already changed
+    '''
+    if timeout_s is None:
+        ts = None
+    else:
+        ts = ctypes.byref(timespec(int(timeout_s), int((timeout_s % 1.0) * 1e9)))
+
+    result = _syscall(SYS_futex, ctypes.c_void_p(address), FUTEX_WAIT, ctypes.c_uint32(expected), ts, None, 0)
+
+    return not (result == -1 and ctypes.get_errno() == errno.ETIMEDOUT)
+
+
+def wake(address, count=WAKE_ALL):
+    '''
+    Wake up to count waiters parked on address
+    :return: number of waiters woken
+    '''
+    return _syscall(SYS_futex, ctypes.c_void_p(address), FUTEX_WAKE, count, None, None, 0)
@@ -5,25 +5,66 @@ import mmap
 import os
 import struct
 import ctypes
+import time
+import fcntl
+import errno
+import json
+from cog_tx.mem_manager import futex
 from collections import namedtuple
 
 FrameHeader = namedtuple("FrameHeader", "frame_id length type number_of_instances data_index preamble_length")
-ChannelHeader = namedtuple("ChannelHeader", "channel_id active_pointer source center_freq_hz sample_rate_hz")
+ChannelHeader = namedtuple("ChannelHeader", "channel_id active_pointer write_sequence reserve_sequence center_freq_hz sample_rate_hz source ring_start ring_capacity frame_count latest_frame_id generation carrier_count notify_sequence ring_base")
+FrameTableEntry = namedtuple("FrameTableEntry", "frame_id frame_index length type timestamp")
+ReaderSlot = namedtuple("ReaderSlot", "slot pid position timestamp")
+CarrierEntry = namedtuple("CarrierEntry", "channel modulation_type symbol_rate_Bd frequency_offset_hz excess_bw samples_per_symbol")
+Telemetry = namedtuple("Telemetry", "state samples_produced start_time update_time underruns")
+
+# binary layouts (native byte order, no padding) -- see header specifications in shm_mem
+channel_header_codec = struct.Struct('=iiQQddc3xiiiiIiIQ40x')
+frame_header_codec = struct.Struct('=iic3xdi')
+frame_table_entry_codec = struct.Struct('=iiic3xd')
+reader_slot_codec = struct.Struct('=iiQd')
+carrier_entry_codec = struct.Struct('=i12sdddi4x')
+telemetry_codec = struct.Struct('=IiQddI4x')     # sequence word first, fills the channel header's last 40 bytes
+
+# structured dtype matching frame_header_codec for batch decoding
+frame_header_dtype = np.dtype([('frame_id', np.int32), ('length', np.int32), ('type', 'S1'), ('reserved', 'V3'),
+                               ('number_of_instances', np.float64), ('preamble_length', np.int32)])
+
+
+class ring_cursor(object):
+
+    # absolute stream position (in bytes) of the next read
+    position = 0
+
+    # overrun bookkeeping: number of times the writer lapped this reader and bytes lost
+    overruns = 0
+    overrun_bytes = 0
+
+    # reader table slot when registered with the writer (None = anonymous reader)
+    slot = None
+
+    def __init__(self, position=0, slot=None):
+        self.position = position
+        self.slot = slot
 
 
 class shm_mem(object):
 
     # shared memory info
     path = '/dev/shm/cogmap-'
+    hugepage_path = '/dev/hugepages/cogmap-'   # hugetlbfs mount
     file_descriptor = None
 
     # shared memory buffer info
     buffer = None
     open = False
-    buffer_size = 62500 * mmap.PAGESIZE  #(typically page map is 4096 bytes
+    default_buffer_size = 62500 * mmap.PAGESIZE  #(typically page map is 4096 bytes
+    buffer_size = default_buffer_size
+    map_populate = getattr(mmap, 'MAP_POPULATE', 0x8000)  # linux value, exposed by mmap only on python >= 3.10
 
     # channel header info
-    channel_header_size_bytes = 100
+    channel_header_size_bytes = channel_header_codec.size
     channel_id = 0
     active_pointer = 0  # only writes will move this
     source = 't'        # 't' = transmit, 'r' = receive
@@ -32,31 +73,121 @@ class shm_mem(object):
 
     channel_id_index = 0
     active_pointer_index = 4
-    source_index = 8
-    center_frequency_hz_index = 12
-    sample_rate_hz_index = 20
+    write_sequence_index = 8    # 64-bit fields on 8 byte boundaries
+    reserve_sequence_index = 16
+    center_frequency_hz_index = 24
+    sample_rate_hz_index = 32
+    source_index = 40
+    ring_start_index = 44
+    ring_capacity_index = 48
+    frame_count_index = 52
+    latest_frame_id_index = 56
+    generation_index = 60
+    carrier_count_index = 64
+    notify_sequence_index = 68
+    ring_base_index = 72
+    telemetry_index = 80
+
+    # ring buffer info (ring_capacity = 0 means linear mode)
+    write_sequence = 0  # total bytes ever written to the ring, never reset while the segment exists
+    ring_base = 0       # write_sequence at the last (re)configuration
+    ring_start = 0
+    ring_capacity = 0
+    ring_alignment_bytes = 64
 
     # frame header info
-    frame_header_size_bytes = 24
-
-
-    def __init__(self, channel_id, write_permissions=False):
+    frame_header_size_bytes = frame_header_codec.size
+    frame_alignment_bytes = 8   # frame headers and payloads start on 8 byte boundaries (complex64 / float64 fields)
+
+    # frame table info (direct mapped: slot = frame_id % frame_table_entries). A channel holds at most
+    # frame_table_entries frames between header writes, with ids distinct mod frame_table_entries;
+    # writing a frame whose slot holds a different frame fails instead of hiding the older one
+    frame_table_index = 128
+    frame_table_entries = 256
+    frame_table_entry_size_bytes = frame_table_entry_codec.size
+    frame_table_size_bytes = frame_table_entries * frame_table_entry_size_bytes
+    frame_count = 0
+
+    # reader table info (follows the frame table, survives channel header rewrites)
+    reader_table_index = frame_table_index + frame_table_size_bytes
+    reader_slots = 16
+    reader_slot_size_bytes = reader_slot_codec.size
+    reader_table_size_bytes = reader_slots * reader_slot_size_bytes
+
+    # carrier table info (per-carrier parameters of a multi-carrier transmission)
+    carrier_table_index = reader_table_index + reader_table_size_bytes
+    max_carriers = 16
+    carrier_entry_size_bytes = carrier_entry_codec.size
+    carrier_table_size_bytes = max_carriers * carrier_entry_size_bytes
+    data_start_index = carrier_table_index + carrier_table_size_bytes
+
+    # writer behaviour when the slowest registered reader would be overrun
+    overflow_policies = ('overwrite', 'drop', 'block')
+    overflow_policy = 'overwrite'
+    block_timeout_s = 1.0
+    dropped_bytes = 0
+
+    # writable mapping of the control pages (header, frame table, reader table) for registered readers
+    control = None
+
+    # record / replay
+    capture_chunk_bytes = 64 * 1024 * 1024
+
+    # transmit telemetry (own sequence word, published by the running flowgraph)
+    telemetry_states = ('idle', 'running', 'complete', 'halted')
+    telemetry_sequence = 0
+
+    # seqlock / wakeup state
+    generation = 0
+    notify_word = None
+    consistent_read_timeout_s = 1.0  # a writer stuck mid-update (e.g. killed) must not hang readers forever
+    wait_spin_s = 20e-6     # busy poll this long before parking
+    wait_max_sleep_s = 1e-3 # backoff ceiling when futexes are unavailable
+
+    # element types supported by the bulk vector writer
+    vector_dtypes = (np.dtype(np.int8), np.dtype(np.uint8), np.dtype(np.int16), np.dtype(np.int32), np.dtype(np.float32), np.dtype(np.complex64))
+
+    # frame type char -> payload element type ('p' frames hold length bits packed MSB first)
+    frame_dtypes = {
+        'i': np.dtype(np.int32),
+        'f': np.dtype(np.float32),
+        'c': np.dtype(np.complex64),
+        'b': np.dtype(np.uint8),
+        'p': np.dtype(np.uint8),
+    }
+
+
+    def __init__(self, channel_id, write_permissions=False, buffer_size=None, populate=False, hugepages=False):
 
         # save channel_id
         self.channel_id = channel_id
 
+        # segment lives on hugetlbfs when requested (size must be a multiple of the huge page size)
+        if hugepages:
+            self.path = self.hugepage_path
+
         # Create the mmap instace with the following params:
         # fd: File descriptor which backs the mapping or -1 for anonymous mapping
         # length: Must in multiples of PAGESIZE (usually 4 KB)
-        # flags: MAP_SHARED means other processes can share this mmap
+        # flags: MAP_SHARED means other processes can share this mmap,
+        #        MAP_POPULATE pre-faults every page at map time
         # prot: PROT_WRITE means this process can write to this mmap
+        flags = mmap.MAP_SHARED
+        if populate:
+            flags = flags | self.map_populate
+
         if not write_permissions:
 
             # open file disk space backing memory map
             self.file_descriptor = os.open(self.path+str(self.channel_id), os.O_RDONLY)
 
+            # readers take the size the writer created
+            if buffer_size is None:
+                buffer_size = os.fstat(self.file_descriptor).st_size
+            self.buffer_size = buffer_size
+
             # map
-            self.buffer = mmap.mmap(self.file_descriptor, self.buffer_size, mmap.MAP_SHARED, mmap.PROT_READ)
+            self.buffer = mmap.mmap(self.file_descriptor, self.buffer_size, flags, mmap.PROT_READ)
 
             self.open = True
 
@@ -65,14 +196,21 @@ class shm_mem(object):
 
         else:
 
+            if buffer_size is None:
+                buffer_size = self.default_buffer_size
+
+            # round up to whole pages
+            page_size = self.huge_page_size() if hugepages else mmap.PAGESIZE
+            self.buffer_size = -(-buffer_size // page_size) * page_size
+
             # create file disk space for backing memory map
             self.file_descriptor = os.open(self.path + str(self.channel_id), os.O_CREAT | os.O_TRUNC | os.O_RDWR)
 
-            # clear file
-            assert os.write(self.file_descriptor, '\x00' * self.buffer_size) == self.buffer_size
+            # size file without writing it: pages are sparse and zero-filled by the kernel on first touch
+            os.ftruncate(self.file_descriptor, self.buffer_size)
 
             # map
-            self.buffer = mmap.mmap(self.file_descriptor, self.buffer_size, mmap.MAP_SHARED, mmap.PROT_WRITE)
+            self.buffer = mmap.mmap(self.file_descriptor, self.buffer_size, flags, mmap.PROT_WRITE)
 
             self.open = True
 
@@ -80,70 +218,163 @@ class shm_mem(object):
             self.source = 't'
 
 
+    @staticmethod
+    def huge_page_size():
+
+        # default huge page size from the kernel, 2 MB if it cannot be determined
+        try:
+            with open('/proc/meminfo') as meminfo:
+                for line in meminfo:
+                    if line.startswith('Hugepagesize:'):
+                        return int(line.split()[1]) * 1024
+        except (IOError, OSError, ValueError):
+            pass
+
+        return 2 * 1024 * 1024
+
+
     def write_channel_header(self, center_frequency_hz = None, sample_rate_hz = None):
 
         ##-- Channel Header Specification --##
         # int32 channel_id
         # int32 active_pointer
-        # char 1 source: 't' for tx, 'r' for rx
-        # char 3 bytes reserved
+        # uint64 write sequence (bytes written to ring)
+        # uint64 reserve sequence (bytes claimed by the writer, ahead of write sequence during a copy)
         # float64 center frequency hz
         # float64 sample rate hz
-        # 72 bytes reserved
+        # char 1 source: 't' for tx, 'r' for rx
+        # char 3 bytes reserved
+        # int32 ring start
+        # int32 ring capacity (0 for linear mode)
+        # int32 frame count
+        # int32 latest frame id
+        # uint32 generation (seqlock: odd while the writer is updating headers)
+        # int32 carrier count (multi-carrier transmissions)
+        # uint32 notify sequence (bumped on every publish, readers park on it)
+        # uint64 ring base (write sequence when the ring was last configured, older positions are stale)
+        # telemetry (40 bytes, zeroed here):
+        #   uint32 telemetry sequence (odd while the flowgraph is updating it)
+        #   int32 state: index into telemetry_states
+        #   uint64 samples produced (handed to the transmit sink, not yet necessarily sent by the radio)
+        #   float64 start time (seconds since epoch)
+        #   float64 last update time (seconds since epoch)
+        #   uint32 underruns
+        #   char 4 bytes reserved
+        #
+        ##-- Frame Table (at frame_table_index, after the channel header) --##
+        # frame_table_entries x (slot = frame_id % frame_table_entries, cleared by write_channel_header)
+        #   int32 frame_id
+        #   int32 frame index (offset of frame header, 0 = empty slot)
+        #   int32 length
+        #   char 1 type
+        #   char 3 bytes reserved
+        #   float64 timestamp (seconds since epoch)
+        #
+        ##-- Reader Table (at reader_table_index, after the frame table) --##
+        # reader_slots x
+        #   int32 pid (0 = free slot)
+        #   int32 reserved
+        #   uint64 position (ring bytes consumed)
+        #   float64 timestamp of last commit (seconds since epoch)
+        #
+        ##-- Carrier Table (at carrier_table_index, after the reader table) --##
+        # max_carriers x
+        #   int32 synthesis filterbank channel
+        #   char 12 modulation type
+        #   float64 symbol rate Bd
+        #   float64 frequency offset hz (from center frequency)
+        #   float64 excess bandwidth
+        #   int32 samples per symbol
+        #   char 4 bytes reserved
 
         self.center_frequency_hz = center_frequency_hz
         self.sample_rate_hz = sample_rate_hz
         self.active_pointer = 0
+        self.write_sequence = self.read_uint64(self.write_sequence_index)
+        self.ring_base = self.write_sequence
+        self.ring_start = 0
+        self.ring_capacity = 0
+        self.frame_count = 0
+        notify_sequence = self.read_uint32(self.notify_sequence_index)
+
+        self.begin_header_update()
+
+        # --- whole header in one store --- #
+        channel_header_codec.pack_into(self.buffer, 0,
+                                       self.channel_id,
+                                       self.channel_header_size_bytes,
+                                       self.write_sequence,
+                                       self.write_sequence,
+                                       self.center_frequency_hz,
+                                       self.sample_rate_hz,
+                                       self._char(self.source),
+                                       self.ring_start,
+                                       self.ring_capacity,
+                                       self.frame_count,
+                                       0,
+                                       self.generation,
+                                       0,
+                                       notify_sequence,
+                                       self.ring_base)
+        self.active_pointer = self.channel_header_size_bytes
+
+        # --- clear frame table (reader registrations are kept), frames start after the reader table --- #
+        self.buffer[self.channel_header_size_bytes:self.reader_table_index] = b'\x00' * (self.reader_table_index - self.channel_header_size_bytes)
+        self.move_active_pointer(self.data_start_index - self.active_pointer)
+
+        self.end_header_update()
+
+
+    def update_channel_params(self, center_frequency_hz, sample_rate_hz):
+
+        # retune without resetting frames: only the two fields change, under the seqlock
+        self.center_frequency_hz = center_frequency_hz
+        self.sample_rate_hz = sample_rate_hz
 
-        # --- int32 channel_id --- #
-        self.write_int32(self.channel_id)
-
-        # --- int32 active_pointer --- #
-        self.write_int32(self.active_pointer)
-
-        # --- char1 origin --- #
-        self.write_string(self.source)
-
-        # --- char3 RESERVED --- #
-        for i in range(3):
-            self.write_string('\x00')
-
-        # --- float64 (IEEE 754-2008) center frequency --- #
-        self.write_double(self.center_frequency_hz)
-
-        # --- float64 (IEEE 754-2008) sample rate --- #
-        self.write_double(self.sample_rate_hz)
-
-        # --- 72 bytes RESERVED --- #
-        for i in range(72):
-            self.write_string('\x00')
+        self.begin_header_update()
+        ctypes.c_double.from_buffer(self.buffer, self.center_frequency_hz_index).value = center_frequency_hz
+        ctypes.c_double.from_buffer(self.buffer, self.sample_rate_hz_index).value = sample_rate_hz
+        self.end_header_update()
 
 
-    def read_channel_header(self):
+    def read_channel_header(self, timeout_s=None):
 
         ##-- Channel Header Specification --##
         # int32 channel_id
         # int32 active_pointer
-        # char 1 source: 't' for tx, 'r' for rx
-        # char 3 bytes reserved
+        # uint64 write sequence (bytes written to ring)
+        # uint64 reserve sequence (bytes claimed by the writer, ahead of write sequence during a copy)
         # float64 center frequency hz
         # float64 sample rate hz
-        # 72 bytes reserved
-
-        # --- int32 length --- #
-        channel_id_value = self.read_int32(self.channel_id_index)
-
-        # --- int32 length --- #
-        active_ptr_value = self.read_int32(self.active_pointer_index)
-
-        # --- char1 origin --- #
-        source_value = self.read_char(self.source_index)
-
-        # --- float64 number_of_instances --- #
-        center_freq_hz_value = self.read_double(self.center_frequency_hz_index)
-        sample_rate_hz_value = self.read_double(self.sample_rate_hz_index)
+        # char 1 source: 't' for tx, 'r' for rx
+        # char 3 bytes reserved
+        # int32 ring start
+        # int32 ring capacity (0 for linear mode)
+        # int32 frame count
+        # int32 latest frame id
+        # uint32 generation (seqlock: odd while the writer is updating headers)
+        # int32 carrier count (multi-carrier transmissions)
+        # uint32 notify sequence (bumped on every publish, readers park on it)
+        # uint64 ring base (write sequence when the ring was last configured, older positions are stale)
+        # telemetry (40 bytes, zeroed here):
+        #   uint32 telemetry sequence (odd while the flowgraph is updating it)
+        #   int32 state: index into telemetry_states
+        #   uint64 samples produced (handed to the transmit sink, not yet necessarily sent by the radio)
+        #   float64 start time (seconds since epoch)
+        #   float64 last update time (seconds since epoch)
+        #   uint32 underruns
+        #   char 4 bytes reserved
+        #
+        ##-- Frame Table (at frame_table_index, after the channel header) --##
+        # frame_table_entries x (slot = frame_id % frame_table_entries, cleared by write_channel_header)
+        #   int32 frame_id
+        #   int32 frame index (offset of frame header, 0 = empty slot)
+        #   int32 length
+        #   char 1 type
+        #   char 3 bytes reserved
+        #   float64 timestamp (seconds since epoch)
 
-        return ChannelHeader(channel_id_value, active_ptr_value, source_value, center_freq_hz_value, sample_rate_hz_value)
+        return self.read_consistent(lambda: ChannelHeader._make(channel_header_codec.unpack_from(self.buffer, 0)), timeout_s)
 
 
     def write_frame_header(self, frame_id, length, data_type, number_of_instances, preamble_length):
@@ -151,7 +382,7 @@ class shm_mem(object):
         ##-- Frame Header Specification --##
         # int32 frame_id
         # int32 length
-        # char 1 type : 'i' for int, 'f' for float
+        # char 1 type : 'i' for int32, 'f' for float32, 'c' for complex64, 'b' for uint8, 'p' for packed bits
         # char 3 bytes reserved
         # float64 number_of_instances
         # int32 preamble length
@@ -160,24 +391,21 @@ class shm_mem(object):
             print('Shared Memory is not available, cannot write header.')
             return
 
-        # --- int32 frame id --- #
-        self.write_int32(frame_id)
+        self.check_frame_slot(frame_id)
 
-        # --- int32 length --- #
-        self.write_int32(length)
+        frame_index = self.active_pointer
 
-        # --- char1 type --- #
-        self.write_string(data_type)
+        self.begin_header_update()
 
-        # --- char3 RESERVED --- #
-        for i in range(3):
-            self.write_string('\x00')
+        # --- whole header in one store --- #
+        frame_header_codec.pack_into(self.buffer, frame_index, frame_id, length, self._char(data_type), number_of_instances, preamble_length)
+        self.move_active_pointer(self.frame_header_size_bytes)
 
-        # --- float64 length --- #
-        self.write_double(number_of_instances)
+        # --- index frame in frame table --- #
+        self.write_frame_table_entry(frame_id, frame_index, length, data_type)
 
-        # --- int32 preamble length --- #
-        self.write_int32(preamble_length)
+        # nothing to wake readers for yet: the frame becomes visible (and readers are woken) in commit_frame
+        self.end_header_update(notify=False)
 
         # index = self.active_pointer-self.frame_header_size_bytes
         # self.print_shmem_contents(self.frame_header_size_bytes, index=index)
@@ -188,7 +416,7 @@ class shm_mem(object):
         ##-- Frame Header Specification --##
         # int32 frame_id
         # int32 length
-        # char 1 type : 'i' for int, 'f' for float
+        # char 1 type : 'i' for int32, 'f' for float32, 'c' for complex64, 'b' for uint8, 'p' for packed bits
         # char 3 bytes reserved
         # float64 number_of_instances
         # int32 preamble length
@@ -201,32 +429,249 @@ class shm_mem(object):
         if index is None:
             index = self.active_pointer
 
-        # self.print_shmem_contents(self.frame_header_size_bytes, index=index)
+        frame_id, length, type, number_of_instances, preamble_length = self.read_consistent(lambda: frame_header_codec.unpack_from(self.buffer, index))
+
+        return FrameHeader(frame_id, length, type, number_of_instances, index + self.frame_header_size_bytes, preamble_length)
+
+
+    def read_generation(self):
+
+        return struct.unpack_from('I', self.buffer, self.generation_index)[0]
+
+
+    def begin_header_update(self):
+
+        # odd generation tells readers a header update is in progress
+        self.generation = self.read_generation() | 1  # stays odd if a dead writer left it odd
+        ctypes.c_uint32.from_buffer(self.buffer, self.generation_index).value = self.generation
+
+
+    def end_header_update(self, notify=True):
+
+        # back to even, then wake parked readers
+        self.generation = (self.generation + 1) & 0xffffffff
+        ctypes.c_uint32.from_buffer(self.buffer, self.generation_index).value = self.generation
+
+        if notify:
+            self.notify()
+
+
+    def notify(self):
+
+        # something was published (header, frame or ring data): bump the notify sequence and wake readers;
+        # the generation word is left alone so seqlock readers only retry on real header updates
+        notify_sequence = (self.read_uint32(self.notify_sequence_index) + 1) & 0xffffffff
+        ctypes.c_uint32.from_buffer(self.buffer, self.notify_sequence_index).value = notify_sequence
+        self.wake_readers()
+
+
+    def wake_readers(self):
+
+        if futex.available:
+            futex.wake(self._notify_address())
+
+
+    def _notify_address(self):
+
+        # address of the notify word in this process' mapping (works for read-only mappings too)
+        if self.notify_word is None:
+            self.notify_word = np.frombuffer(self.buffer, dtype=np.uint32, count=1, offset=self.notify_sequence_index)
+
+        return self.notify_word.ctypes.data
+
+
+    def read_consistent(self, read, timeout_s=None):
+
+        ##-- Seqlock read --##
+        # retry until the generation is even and unchanged across the read, give up after timeout_s
+
+        if timeout_s is None:
+            timeout_s = self.consistent_read_timeout_s
+
+        deadline = time.time() + timeout_s
+
+        while True:
+            generation = self.read_generation()
+            if not generation & 1:
+                value = read()
+
+                if self.read_generation() == generation:
+                    return value
+
+            if time.time() > deadline:
+                raise RuntimeError('Shared memory header update did not complete within ' + str(timeout_s) + ' s.')
+
+            time.sleep(0)
+
+
+    def wait_for_update(self, predicate, timeout_s=None):
+
+        ##-- Reader wakeup --##
+        # spin briefly for low latency, then park on the notify word with a futex
+        # (adaptive sleep backoff where futexes are unavailable) until predicate() holds
+
+        start = time.time()
+        deadline = None if timeout_s is None else start + timeout_s
+        delay = 1e-6
+
+        while True:
+            notify_sequence = self.read_uint32(self.notify_sequence_index)
+
+            if predicate():
+                return True
+
+            now = time.time()
+            if deadline is not None and now >= deadline:
+                return False
+
+            if now - start < self.wait_spin_s:
+                continue
+
+            remaining = None if deadline is None else deadline - now
+
+            if futex.available:
+                futex.wait(self._notify_address(), notify_sequence, remaining)
+            else:
+                delay = min(delay * 2, self.wait_max_sleep_s)
+                time.sleep(delay if remaining is None else min(delay, remaining))
+
+
+    def wait_for_frame(self, frame_count=None, timeout_s=None):
+
+        # wait for a frame beyond frame_count (default: the next frame written from now on)
+        if frame_count is None:
+            frame_count = self.read_int32(self.frame_count_index)
+
+        if not self.wait_for_update(lambda: self.read_int32(self.frame_count_index) > frame_count, timeout_s):
+            return None
+
+        return self.find_latest_frame()
+
+
+    def wait_for_ring(self, cursor, timeout_s=None):
+
+        # wait until the writer has published ring data beyond the cursor
+        return self.wait_for_update(lambda: self.read_uint64(self.write_sequence_index) > cursor.position, timeout_s)
+
+
+    def read_frame_headers(self, indices=None):
+
+        if not self.open:
+            print('Shared Memory is not available, cannot read headers.')
+            return
+
+        # default to every frame in the frame table, in write order
+        if indices is None:
+            indices = sorted(entry.frame_index for entry in self.read_frame_table() if entry.frame_index != 0)
+
+        indices = np.asarray(indices, dtype=np.intp).reshape(-1)
+
+        # gather all headers in one fancy-index copy and reinterpret as structured records
+        raw = np.frombuffer(self.buffer, dtype=np.uint8)
+        rows = raw[indices[:, np.newaxis] + np.arange(self.frame_header_size_bytes)]
+
+        return rows.view(frame_header_dtype).reshape(-1)
+
 
-        # --- int32 frame_id --- #
-        frame_id = self.read_int32(index)
-        index = index + 4
+    def check_frame_slot(self, frame_id):
 
-        # --- int32 length --- #
-        length = self.read_int32(index)
-        index = index + 4
+        # the slot may be empty or hold an older copy of the same frame id (replaced), never another frame
+        entry_index = self.frame_table_index + (frame_id % self.frame_table_entries) * self.frame_table_entry_size_bytes
+        entry = FrameTableEntry._make(frame_table_entry_codec.unpack_from(self.buffer, entry_index))
 
-        # --- char1 type --- #
-        type = self.read_char(index)
-        index = index + 1
+        assert entry.frame_index == 0 or entry.frame_id == frame_id, \
+            'Frame table slot of frame ' + str(frame_id) + ' is taken by frame ' + str(entry.frame_id) + \
+            ' (at most ' + str(self.frame_table_entries) + ' frames per channel, ids must differ mod ' + str(self.frame_table_entries) + ').'
 
-        # --- char3 RESERVED --- #
-        index = index + 3
 
-        # --- float64 number_of_instances --- #
-        number_of_instances = self.read_double(index)
-        index = index + 8
+    def write_frame_table_entry(self, frame_id, frame_index, length, data_type):
 
-        # --- int32 length --- #
-        preamble_length = self.read_int32(index)
-        index = index + 4
+        entry_index = self.frame_table_index + (frame_id % self.frame_table_entries) * self.frame_table_entry_size_bytes
 
-        return FrameHeader(frame_id, length, type, number_of_instances, index, preamble_length)
+        # overwrite slot (evicts any older frame mapped to the same slot);
+        # frame_count / latest_frame_id are only advanced by commit_frame once the payload is written
+        frame_table_entry_codec.pack_into(self.buffer, entry_index, frame_id, frame_index, length, self._char(data_type), time.time())
+
+
+    def commit_frame(self, frame_id):
+
+        if not self.open:
+            print('Shared Memory is not available, cannot commit frame.')
+            return
+
+        # publish a frame whose payload is complete: readers waiting on frame_count see it from here on
+        self.begin_header_update()
+
+        self.frame_count = self.frame_count + 1
+        self.update_int32(self.frame_count_index, self.frame_count)
+        self.update_int32(self.latest_frame_id_index, frame_id)
+
+        self.end_header_update()
+
+
+    def read_frame_table_entry(self, frame_id):
+
+        entry_index = self.frame_table_index + (frame_id % self.frame_table_entries) * self.frame_table_entry_size_bytes
+
+        entry = FrameTableEntry._make(frame_table_entry_codec.unpack_from(self.buffer, entry_index))
+
+        # empty slot or slot reused by another frame
+        if entry.frame_index == 0 or entry.frame_id != frame_id:
+            return None
+
+        return entry
+
+
+    def find_frame_index(self, frame_id):
+
+        if not self.open:
+            print('Shared Memory is not available, cannot find frame.')
+            return
+
+        entry = self.read_frame_table_entry(frame_id)
+
+        if entry is None:
+            return None
+
+        return entry.frame_index
+
+
+    def find_frame(self, frame_id):
+
+        frame_index = self.find_frame_index(frame_id)
+
+        if frame_index is None:
+            return None
+
+        return self.read_frame_header(frame_index)
+
+
+    def find_latest_frame(self):
+
+        if self.read_int32(self.frame_count_index) == 0:
+            return None
+
+        return self.find_frame(self.read_int32(self.latest_frame_id_index))
+
+
+    def iter_frames(self):
+
+        if not self.open:
+            print('Shared Memory is not available, cannot read frames.')
+            return
+
+        # visit frames in the order they were written
+        for entry in sorted((e for e in self.read_frame_table() if e.frame_index != 0), key=lambda e: e.frame_index):
+            yield self.read_frame_header(entry.frame_index)
+
+
+    def read_frame_table(self):
+
+        # one slice of the whole table, decoded entry by entry
+        table = self.buffer[self.frame_table_index:self.frame_table_index + self.frame_table_size_bytes]
+
+        return [FrameTableEntry._make(frame_table_entry_codec.unpack_from(table, i * self.frame_table_entry_size_bytes))
+                for i in range(self.frame_table_entries)]
 
 
     def move_active_pointer(self, N):
@@ -292,6 +737,65 @@ class shm_mem(object):
             return struct.unpack('i', self.buffer[index : index + 4])[0]
 
 
+    @staticmethod
+    def _char(c):
+
+        # struct 'c' fields take a single byte
+        return c if isinstance(c, bytes) else c.encode()
+
+
+    @staticmethod
+    def _type_char(c):
+
+        # frame type as str, whether given as str or read back from a header as bytes
+        return c.decode() if isinstance(c, bytes) else c
+
+
+    def update_int32(self, index, i):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot write int32.')
+            return
+
+        # overwrite int in shared mem without moving the active pointer
+        ctypes.c_int.from_buffer(self.buffer, index).value = i
+
+
+    def write_uint64(self, q):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot write uint64.')
+            return
+
+        self.update_uint64(self.active_pointer, q)
+
+        # move active pointer
+        self.move_active_pointer(8)
+
+
+    def update_uint64(self, index, q):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot write uint64.')
+            return
+
+        # overwrite uint64 in shared mem without moving the active pointer (one store, untorn for readers at 8 byte aligned offsets)
+        ctypes.c_uint64.from_buffer(self.buffer, index).value = q
+
+
+    def read_uint32(self, index):
+
+        return struct.unpack_from('I', self.buffer, index)[0]
+
+
+    def read_uint64(self, index=None):
+
+        if index is None:
+            return struct.unpack('Q', self.buffer[self.active_pointer : self.active_pointer + 8])[0]
+        else:
+            return struct.unpack('Q', self.buffer[index : index + 8])[0]
+
+
     def write_double(self, f):
 
         if not self.open:
@@ -346,11 +850,44 @@ class shm_mem(object):
             return struct.unpack('c', self.buffer[index : index + 1])[0]
 
 
+    def write_vector(self, vector, dtype=None):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot write vector.')
+            return
+
+        # contiguous array in the requested element type (no copy if it already is one)
+        vector = np.ascontiguousarray(vector, dtype=dtype)
+
+        assert vector.dtype in self.vector_dtypes, 'Unsupported vector type: ' + str(vector.dtype)
+        assert self.active_pointer + vector.nbytes <= self.buffer_size, 'Vector does not fit in shared memory.'
+
+        # map destination region into a numpy array and copy the whole vector in one slice assignment
+        shmem_vector = np.frombuffer(self.buffer, dtype=vector.dtype, count=vector.size, offset=self.active_pointer)
+        shmem_vector[:] = vector.ravel()
+
+        # move active pointer once for the whole vector
+        self.move_active_pointer(vector.nbytes)
+        self.notify()
+
+
+    def read_vector(self, N, dtype, index=None):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot read vector.')
+            return
+
+        if index is None:
+            index = self.active_pointer
+
+        # memory map from buffer into numpy array
+        return np.frombuffer(self.buffer, dtype=dtype, count=N, offset=index)
+
+
     def write_f32_vector(self, f32_vector):
 
-        # add each float32 to shared mem
-        for f in f32_vector:
-            self.write_float32(f)
+        # add float32 vector to shared mem
+        self.write_vector(f32_vector, dtype=np.float32)
 
 
     def read_f32_vector(self, N, index = None):
@@ -378,9 +915,8 @@ class shm_mem(object):
 
     def write_int32_vector(self, int32_vector):
 
-        # add each int to shared mem
-        for i in int32_vector:
-            self.write_int32(i)
+        # add int32 vector to shared mem
+        self.write_vector(int32_vector, dtype=np.int32)
 
 
     def read_int32_vector(self, N, index=None):
@@ -407,3 +943,554 @@ class shm_mem(object):
         return vector
 
 
+    def configure_ring(self, capacity_bytes=None, overflow_policy='overwrite'):
+
+        ##-- Ring Buffer Mode --##
+        # The ring occupies [ring_start, ring_start + ring_capacity) starting at the current
+        # active pointer. The writer wraps around inside it and publishes the total number of
+        # bytes ever written as write_sequence; readers keep their own absolute position in a
+        # ring_cursor and detect overruns when write_sequence - position > ring_capacity.
+        # Before copying, the writer claims the bytes by advancing reserve_sequence, so a reader
+        # can tell after its copy whether any of [position, position + n) was being overwritten.
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot configure ring.')
+            return
+
+        # start ring on an aligned boundary so any element type can be viewed in place
+        align = self.ring_alignment_bytes
+        ring_start = ((self.active_pointer + align - 1) // align) * align
+
+        if capacity_bytes is None:
+            capacity_bytes = self.buffer_size - ring_start
+
+        # whole number of aligned blocks so elements never straddle the wrap point
+        capacity_bytes = (int(capacity_bytes) // align) * align
+
+        assert capacity_bytes > 0, 'Ring capacity must be positive.'
+        assert ring_start + capacity_bytes <= self.buffer_size, 'Ring does not fit in shared memory.'
+        assert overflow_policy in self.overflow_policies, 'Unknown overflow policy: ' + str(overflow_policy)
+
+        self.overflow_policy = overflow_policy
+        self.dropped_bytes = 0
+
+        self.ring_start = ring_start
+        self.ring_capacity = capacity_bytes
+
+        # write_sequence keeps counting across reconfigurations (readers' positions stay comparable);
+        # everything before ring_base belongs to the old layout and is skipped by readers
+        self.ring_base = self.write_sequence
+
+        self.update_uint64(self.reserve_sequence_index, self.write_sequence)
+        self.update_uint64(self.ring_base_index, self.ring_base)
+        self.update_int32(self.ring_start_index, self.ring_start)
+        self.update_int32(self.ring_capacity_index, self.ring_capacity)
+
+        # registered readers restart at the new ring, dead ones are dropped
+        self.reap_readers()
+        for slot in self.read_reader_table():
+            if slot.position < self.ring_base:
+                self.update_uint64(self.reader_table_index + slot.slot * self.reader_slot_size_bytes + 8, self.ring_base)
+
+        # linear allocations continue after the ring
+        self.move_active_pointer(ring_start + capacity_bytes - self.active_pointer)
+
+
+    def write_ring(self, vector, dtype=None):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot write ring.')
+            return
+
+        assert self.ring_capacity > 0, 'Ring buffer mode is not configured.'
+
+        # raw bytes of the vector (no copy for contiguous input)
+        data = np.ascontiguousarray(vector, dtype=dtype).reshape(-1).view(np.uint8)
+        n = data.size
+
+        assert n <= self.ring_capacity, 'Vector is larger than the ring.'
+
+        # protect registered readers that would be lapped by this write (after dropping dead ones)
+        if self.overflow_policy != 'overwrite' and not self._ring_has_room(n):
+            self.reap_readers()
+
+        if self.overflow_policy != 'overwrite' and not self._ring_has_room(n):
+            if self.overflow_policy == 'drop':
+                self.dropped_bytes += n
+                return None
+            if not self._wait_for_room(n):
+                print ('Timed out waiting for slowest reader, dropping write.')
+                self.dropped_bytes += n
+                return None
+
+        ring = np.frombuffer(self.buffer, dtype=np.uint8, count=self.ring_capacity, offset=self.ring_start)
+
+        # claim the bytes first: readers of the oldest region see it is about to be overwritten
+        self.update_uint64(self.reserve_sequence_index, self.write_sequence + n)
+
+        # copy with at most one wraparound
+        cursor = self.write_sequence % self.ring_capacity
+        first = min(n, self.ring_capacity - cursor)
+        ring[cursor:cursor + first] = data[:first]
+        ring[:n - first] = data[first:]
+
+        # publish after the payload is in place
+        self.write_sequence = self.write_sequence + n
+        self.update_uint64(self.write_sequence_index, self.write_sequence)
+        self.notify()
+
+        return self.write_sequence
+
+
+    def new_ring_cursor(self, latest=True):
+
+        # new readers start at the live edge by default, or at the oldest data still in the ring
+        write_sequence = self.read_uint64(self.write_sequence_index)
+
+        if latest:
+            return ring_cursor(write_sequence)
+
+        ring_capacity = self.read_int32(self.ring_capacity_index)
+        return ring_cursor(max(self.read_uint64(self.ring_base_index), write_sequence - ring_capacity))
+
+
+    def read_ring(self, cursor, N, dtype):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot read ring.')
+            return
+
+        ring_start = self.read_int32(self.ring_start_index)
+        ring_capacity = self.read_int32(self.ring_capacity_index)
+
+        assert ring_capacity > 0, 'Ring buffer mode is not configured.'
+
+        itemsize = np.dtype(dtype).itemsize
+        write_sequence = self.read_uint64(self.write_sequence_index)
+
+        # ring was reconfigured since our last read: older data is gone
+        ring_base = self.read_uint64(self.ring_base_index)
+        if cursor.position < ring_base:
+            cursor.overruns += 1
+            cursor.overrun_bytes += ring_base - cursor.position
+            cursor.position = ring_base
+
+        # writer lapped us: skip ahead to the oldest intact element
+        if write_sequence - cursor.position > ring_capacity:
+            self._ring_overrun(cursor, write_sequence, ring_capacity, itemsize)
+
+        available = (write_sequence - cursor.position) // itemsize
+        n = min(N, available) * itemsize
+
+        ring = np.frombuffer(self.buffer, dtype=np.uint8, count=ring_capacity, offset=ring_start)
+
+        # copy out with at most one wraparound
+        vector = np.empty(n, dtype=np.uint8)
+        start = cursor.position % ring_capacity
+        first = min(n, ring_capacity - start)
+        vector[:first] = ring[start:start + first]
+        vector[first:] = ring[:n - first]
+
+        # writer may have claimed (and be overwriting) part of the region while we were copying
+        reserve_sequence = self.read_uint64(self.reserve_sequence_index)
+        if reserve_sequence - cursor.position > ring_capacity:
+            self._ring_overrun(cursor, reserve_sequence, ring_capacity, itemsize)
+            return np.empty(0, dtype=dtype)
+
+        cursor.position = cursor.position + n
+
+        # tell the writer how far this reader has consumed
+        if cursor.slot is not None:
+            self.commit_reader(cursor)
+
+        return vector.view(dtype)
+
+
+    def _ring_has_room(self, n):
+
+        slowest = self.slowest_reader()
+
+        # positions before ring_base are from a previous ring configuration
+        return slowest is None or self.write_sequence + n - max(slowest.position, self.ring_base) <= self.ring_capacity
+
+
+    def _wait_for_room(self, n):
+
+        # exponential backoff up to a few milliseconds, stale readers are reaped while waiting
+        deadline = time.time() + self.block_timeout_s
+        delay = 1e-5
+
+        while not self._ring_has_room(n):
+            if time.time() > deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 5e-3)
+            self.reap_readers()
+
+        return True
+
+
+    def _open_control(self):
+
+        # readers map the segment read-only, registration needs a small writable view of the control pages
+        if self.control is None:
+            if self.source == 't':
+                self.control = self.buffer
+            else:
+                length = -(-self.data_start_index // mmap.PAGESIZE) * mmap.PAGESIZE
+                fd = os.open(self.path + str(self.channel_id), os.O_RDWR)
+                self.control = mmap.mmap(fd, length, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+                os.close(fd)
+
+        return self.control
+
+
+    def read_reader_table(self):
+
+        table = self.buffer[self.reader_table_index:self.reader_table_index + self.reader_table_size_bytes]
+
+        slots = []
+        for i in range(self.reader_slots):
+            pid, reserved, position, timestamp = reader_slot_codec.unpack_from(table, i * self.reader_slot_size_bytes)
+            if pid != 0:
+                slots.append(ReaderSlot(i, pid, position, timestamp))
+
+        return slots
+
+
+    def slowest_reader(self):
+
+        slots = self.read_reader_table()
+
+        if not slots:
+            return None
+
+        return min(slots, key=lambda slot: slot.position)
+
+
+    def register_reader(self, latest=True):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot register reader.')
+            return
+
+        control = self._open_control()
+        cursor = self.new_ring_cursor(latest)
+
+        # slot search is rare, serialise it across processes with an advisory lock on the segment
+        fcntl.flock(self.file_descriptor, fcntl.LOCK_EX)
+        try:
+            free = [i for i in range(self.reader_slots) if i not in [slot.slot for slot in self.read_reader_table()]]
+            if not free:
+                print ('No free reader slots, reading anonymously.')
+                return cursor
+
+            cursor.slot = free[0]
+            reader_slot_codec.pack_into(control, self.reader_table_index + cursor.slot * self.reader_slot_size_bytes,
+                                        os.getpid(), 0, cursor.position, time.time())
+        finally:
+            fcntl.flock(self.file_descriptor, fcntl.LOCK_UN)
+
+        return cursor
+
+
+    def commit_reader(self, cursor):
+
+        index = self.reader_table_index + cursor.slot * self.reader_slot_size_bytes
+
+        # position first (single aligned store), the writer only ever reads it
+        ctypes.c_uint64.from_buffer(self._open_control(), index + 8).value = cursor.position
+        ctypes.c_double.from_buffer(self._open_control(), index + 16).value = time.time()
+
+
+    def unregister_reader(self, cursor):
+
+        if cursor.slot is None:
+            return
+
+        index = self.reader_table_index + cursor.slot * self.reader_slot_size_bytes
+        self._open_control()[index:index + self.reader_slot_size_bytes] = b'\x00' * self.reader_slot_size_bytes
+        cursor.slot = None
+
+
+    def reap_readers(self):
+
+        # free slots whose process has exited
+        for slot in self.read_reader_table():
+            try:
+                os.kill(slot.pid, 0)
+            except OSError as e:
+                if e.errno == errno.ESRCH:
+                    index = self.reader_table_index + slot.slot * self.reader_slot_size_bytes
+                    self._open_control()[index:index + self.reader_slot_size_bytes] = b'\x00' * self.reader_slot_size_bytes
+
+
+    def _ring_overrun(self, cursor, write_sequence, ring_capacity, itemsize):
+
+        oldest = write_sequence - ring_capacity
+        oldest = cursor.position + -(-(oldest - cursor.position) // itemsize) * itemsize
+
+        cursor.overruns += 1
+        cursor.overrun_bytes += oldest - cursor.position
+        cursor.position = oldest
+
+
+    def write_c64_vector(self, c64_vector):
+
+        # add complex64 vector to shared mem
+        self.write_vector(c64_vector, dtype=np.complex64)
+
+
+    def read_c64_vector(self, N, index=None):
+
+        # memory map from buffer into numpy array
+        return self.read_vector(N, np.complex64, index)
+
+
+    def allocate_frame(self, frame_id, length, data_type, number_of_instances=1.0, preamble_length=0):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot allocate frame.')
+            return
+
+        data_type = self._type_char(data_type)
+        dtype = self.frame_dtypes[data_type]
+        count = self.frame_payload_count(data_type, length)
+
+        self.check_frame_slot(frame_id)
+
+        # header (and so the payload behind it) starts aligned, whatever was written before
+        padding = -self.active_pointer % self.frame_alignment_bytes
+
+        assert self.active_pointer + padding + self.frame_header_size_bytes + count * dtype.itemsize <= self.buffer_size, 'Frame does not fit in shared memory.'
+
+        self.move_active_pointer(padding)
+        self.write_frame_header(frame_id, length, data_type, number_of_instances, preamble_length)
+
+        # writable view of the payload region, producers fill it in place
+        frame = np.frombuffer(self.buffer, dtype=dtype, count=count, offset=self.active_pointer)
+
+        # keep the next frame aligned too (odd length 'b' / 'p' payloads)
+        self.move_active_pointer(min(frame.nbytes + (-frame.nbytes % self.frame_alignment_bytes), self.buffer_size - self.active_pointer))
+
+        return frame
+
+
+    def read_frame(self, frame_header):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot read frame.')
+            return
+
+        type_char = self._type_char(frame_header.type)
+
+        # zero-copy view typed by the frame header
+        return self.read_vector(self.frame_payload_count(type_char, frame_header.length), self.frame_dtypes[type_char], frame_header.data_index)
+
+
+    @staticmethod
+    def frame_payload_count(data_type, length):
+
+        # elements stored for a frame of the given type and length
+        if shm_mem._type_char(data_type) == 'p':
+            return (length + 7) // 8
+
+        return length
+
+
+    def write_frame(self, frame_id, vector, data_type, number_of_instances=1.0, preamble_length=0):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot write frame.')
+            return
+
+        # 'p' frames take one bit per element and store them packed
+        if self._type_char(data_type) == 'p':
+            bits = np.asarray(vector, dtype=np.uint8).reshape(-1)
+            frame = self.allocate_frame(frame_id, bits.size, data_type, number_of_instances, preamble_length)
+            frame[:] = np.packbits(bits)
+        else:
+            vector = np.asarray(vector).reshape(-1)
+            frame = self.allocate_frame(frame_id, vector.size, data_type, number_of_instances, preamble_length)
+            frame[:] = vector
+
+        self.commit_frame(frame_id)
+
+        return frame
+
+
+    def write_uint8_vector(self, uint8_vector):
+
+        # add uint8 vector to shared mem
+        self.write_vector(uint8_vector, dtype=np.uint8)
+
+
+    def read_uint8_vector(self, N, index=None):
+
+        # memory map from buffer into numpy array
+        return self.read_vector(N, np.uint8, index)
+
+
+    def read_bits(self, frame_header):
+
+        # unpacked bits of a 'p' frame (packed payload itself is available zero-copy through read_frame)
+        return np.unpackbits(self.read_frame(frame_header))[:frame_header.length]
+
+
+    def snapshot(self, capture_path):
+
+        ##-- Capture Format --##
+        # <capture_path>       raw image of the segment from offset 0 to the active pointer
+        #                      (channel header, frame table, reader table, frames) -- opened with mmap
+        # <capture_path>.json  metadata sidecar: channel header, frame list, capture time
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot snapshot.')
+            return
+
+        # consistent copy of the control pages, payloads follow
+        header, control = self.read_consistent(lambda: (self.read_channel_header(), self.buffer[:self.data_start_index]))
+        length = max(header.active_pointer, self.data_start_index)
+
+        with open(capture_path, 'wb') as capture:
+            capture.write(control)
+
+            # payloads in bounded chunks so large channels never need a second full copy in memory
+            for index in range(self.data_start_index, length, self.capture_chunk_bytes):
+                capture.write(self.buffer[index:min(index + self.capture_chunk_bytes, length)])
+
+        frames = [entry for entry in self.read_frame_table() if entry.frame_index != 0 and entry.frame_index < length]
+        frames.sort(key=lambda entry: entry.frame_index)
+
+        metadata = {
+            'version': 1,
+            'captured_at': time.time(),
+            'length_bytes': length,
+            'channel_header': dict((k, v.decode() if isinstance(v, bytes) else v) for k, v in header._asdict().items()),
+            'frames': [{'frame_id': e.frame_id, 'frame_index': e.frame_index, 'length': e.length,
+                        'type': e.type.decode(), 'timestamp': e.timestamp} for e in frames],
+        }
+
+        with open(capture_path + '.json', 'w') as sidecar:
+            json.dump(metadata, sidecar, indent=2)
+
+        return metadata
+
+
+    @classmethod
+    def open_capture(cls, capture_path):
+
+        # map a capture read-only; every reader method (find_frame, read_frame, iter_frames, ...) works on it unchanged
+        capture = cls.__new__(cls)
+        capture.path = capture_path
+        capture.file_descriptor = os.open(capture_path, os.O_RDONLY)
+        capture.buffer_size = os.fstat(capture.file_descriptor).st_size
+        capture.buffer = mmap.mmap(capture.file_descriptor, capture.buffer_size, mmap.MAP_SHARED, mmap.PROT_READ)
+        capture.open = True
+        capture.source = 'r'
+
+        header = capture.read_channel_header()
+        capture.channel_id = header.channel_id
+        capture.active_pointer = header.active_pointer
+
+        return capture
+
+
+    def replay(self, capture, rate=1.0):
+
+        # replay the frames of a capture into this (writable) channel, in write order;
+        # rate 1.0 keeps the original frame spacing, 2.0 is twice as fast, None is as fast as possible
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot replay.')
+            return
+
+        header = capture.read_channel_header()
+        self.write_channel_header(center_frequency_hz=header.center_freq_hz, sample_rate_hz=header.sample_rate_hz)
+
+        entries = sorted((e for e in capture.read_frame_table() if e.frame_index != 0), key=lambda e: e.frame_index)
+
+        start = time.time()
+        for entry in entries:
+
+            if rate:
+                delay = (entry.timestamp - entries[0].timestamp) / rate - (time.time() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            frame_header = capture.read_frame_header(entry.frame_index)
+            type_char = self._type_char(frame_header.type)
+
+            frame = self.allocate_frame(frame_header.frame_id, frame_header.length, type_char,
+                                        frame_header.number_of_instances, frame_header.preamble_length)
+            frame[:] = capture.read_frame(frame_header)
+            self.commit_frame(frame_header.frame_id)
+
+        return len(entries)
+
+
+    def write_telemetry(self, state, samples_produced, start_time, underruns=0):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot write telemetry.')
+            return
+
+        # own sequence word, so counter updates neither contend with header updates nor wake frame readers
+        self.telemetry_sequence = (struct.unpack_from('I', self.buffer, self.telemetry_index)[0] | 1)
+        ctypes.c_uint32.from_buffer(self.buffer, self.telemetry_index).value = self.telemetry_sequence
+
+        telemetry_codec.pack_into(self.buffer, self.telemetry_index, self.telemetry_sequence,
+                                  self.telemetry_states.index(state), samples_produced, start_time, time.time(), underruns)
+
+        self.telemetry_sequence = (self.telemetry_sequence + 1) & 0xffffffff
+        ctypes.c_uint32.from_buffer(self.buffer, self.telemetry_index).value = self.telemetry_sequence
+
+
+    def read_telemetry(self, timeout_s=None):
+
+        # same retry rule as read_consistent, on the telemetry sequence word
+        if timeout_s is None:
+            timeout_s = self.consistent_read_timeout_s
+
+        deadline = time.time() + timeout_s
+
+        while True:
+            fields = telemetry_codec.unpack_from(self.buffer, self.telemetry_index)
+            if not fields[0] & 1 and struct.unpack_from('I', self.buffer, self.telemetry_index)[0] == fields[0]:
+                state = fields[1] if 0 <= fields[1] < len(self.telemetry_states) else 0
+                return Telemetry(self.telemetry_states[state], *fields[2:])
+
+            if time.time() > deadline:
+                raise RuntimeError('Telemetry update did not complete within ' + str(timeout_s) + ' s.')
+
+            time.sleep(0)
+
+
+    def write_carriers(self, carriers):
+
+        if not self.open:
+            print ('Shared Memory is not available, cannot write carriers.')
+            return
+
+        assert len(carriers) <= self.max_carriers, 'Too many carriers for the carrier table.'
+
+        self.begin_header_update()
+
+        for i, carrier in enumerate(carriers):
+            carrier_entry_codec.pack_into(self.buffer, self.carrier_table_index + i * self.carrier_entry_size_bytes,
+                                          carrier.channel, carrier.modulation_type.encode(), carrier.symbol_rate_Bd,
+                                          carrier.frequency_offset_hz, carrier.excess_bw, carrier.samples_per_symbol)
+
+        self.update_int32(self.carrier_count_index, len(carriers))
+
+        self.end_header_update()
+
+
+    def read_carriers(self):
+
+        def read():
+            count = self.read_int32(self.carrier_count_index)
+            entries = [carrier_entry_codec.unpack_from(self.buffer, self.carrier_table_index + i * self.carrier_entry_size_bytes) for i in range(count)]
+            return [CarrierEntry(e[0], e[1].rstrip(b'\x00').decode(), e[2], e[3], e[4], e[5]) for e in entries]
+
+        return self.read_consistent(read)
@@ -0,0 +1,103 @@
+import math
+import numpy as np
+from gnuradio import gr
+from gnuradio import filter
+from np_channel_model import noise_sigma, complex_noise
+
+
+"""
+GNU Radio version of np_channel_model: sample-rate offset, multipath, frequency offset, phase noise and
+AWGN on a sample stream. set_params() changes the impairments between bursts without rebuilding or
+restarting the flowgraph.
+"""
+
+
+class impairments(gr.sync_block):
+    '''
+    Multipath, frequency offset, phase noise and AWGN on a sample stream. Filter history and
+    oscillator phase carry over between work calls; noise is scaled to a running estimate of the
+    signal power.
+    '''
+
+    # longest delay line supported, in samples
+    max_delay = 64
+
+    def __init__(self, params, sample_rate_hz, samples_per_symbol, seed=None):
+        gr.sync_block.__init__(
+            self, name="impairments",
+            in_sig=[np.complex64],
+            out_sig=[np.complex64],
+        )
+
+        self.sample_rate_hz = float(sample_rate_hz)
+        self.samples_per_symbol = samples_per_symbol
+        self.rng = np.random.RandomState(seed)
+        self.history = np.zeros(self.max_delay, dtype=np.complex64)
+        self.phase = 0.0
+        self.power = None
+        self.set_params(params)
+
+    def set_params(self, params):
+        assert len(params.taps) <= self.max_delay + 1, 'At most ' + str(self.max_delay + 1) + ' taps are supported.'
+        self.params = params
+
+    def work(self, input_items, output_items):
+        x = input_items[0]
+        out = output_items[0]
+        p = self.params
+        n = len(x)
+
+        # multipath over the previous max_delay input samples and this buffer
+        taps = np.asarray(p.taps, dtype=np.complex64)
+        if len(taps) > 1:
+            y = np.convolve(np.concatenate((self.history[self.max_delay - len(taps) + 1:], x)), taps, 'valid')
+        else:
+            y = x * taps[0]
+
+        self.history = np.concatenate((self.history, x))[-self.max_delay:]
+
+        # oscillator: frequency offset plus random walk phase
+        w = 2 * math.pi * p.cfo_hz / self.sample_rate_hz
+        if w or p.phase_noise_rad or self.phase:
+            phase = self.phase + w * np.arange(n)
+            if p.phase_noise_rad:
+                phase += np.cumsum(self.rng.standard_normal(n) * p.phase_noise_rad)
+            y = y * np.exp(1j * phase).astype(np.complex64)
+            self.phase = math.fmod(phase[-1] + w, 2 * math.pi) if n else self.phase
+
+        # noise
+        if p.esn0_dB is not None and n:
+            power = np.mean(np.abs(y) ** 2)
+            self.power = power if self.power is None else 0.9 * self.power + 0.1 * power
+            y = y + complex_noise(self.rng, (n,), noise_sigma(self.power, self.samples_per_symbol, p.esn0_dB))
+
+        out[:] = y
+        return n
+
+
+class channel(gr.hier_block2):
+    '''
+    Sample-rate offset (fractional resampler) followed by the impairments block
+    '''
+
+    def __init__(self, params, sample_rate_hz, samples_per_symbol, seed=None):
+        gr.hier_block2.__init__(
+            self, "channel",
+            gr.io_signature(1, 1, gr.sizeof_gr_complex * 1),
+            gr.io_signature(1, 1, gr.sizeof_gr_complex * 1),
+        )
+
+        # renamed mmse_resampler_cc in GNU Radio 3.8
+        resampler = getattr(filter, 'mmse_resampler_cc', None) or filter.fractional_resampler_cc
+
+        self.resampler = resampler(0, 1 + params.sro_ppm * 1e-6)
+        self.impairments = impairments(params, sample_rate_hz, samples_per_symbol, seed)
+
+        self.connect(self, self.resampler, self.impairments, self)
+
+    def set_params(self, params):
+        '''
+        Change impairments on the running graph, e.g. between bursts
+        '''
+        self.resampler.set_resamp_ratio(1 + params.sro_ppm * 1e-6)
+        self.impairments.set_params(params)
@@ -0,0 +1,61 @@
+import numpy as np
+from collections import namedtuple
+
+
+"""
+Builds transmit bursts (preamble + random data) directly inside a shared memory frame. The burst is
+one contiguous uint8 buffer from generation onwards: random bytes are drawn in one call, copied once
+into the frame view, and the GNURadio source streams the same memory (sources.shm_bytes).
+"""
+
+# views into the shared memory frame
+Burst = namedtuple("Burst", "frame_id frame_index burst preamble data")
+
+
+class frame_builder(object):
+
+    # class constants
+    preamble_size_bits = 256
+    random_sequence_size_bits = 10240
+
+    def __init__(self, cbp, seed=None, preamble_size_bits=None, random_sequence_size_bits=None):
+
+        self.cbp = cbp
+        self.seed = seed
+
+        # seeded generator: same seed, same sequence of bursts
+        self.random = np.random.RandomState(seed)
+
+        if preamble_size_bits is not None:
+            self.preamble_size_bits = preamble_size_bits
+        if random_sequence_size_bits is not None:
+            self.random_sequence_size_bits = random_sequence_size_bits
+
+        self.preamble_size_bytes = int(self.preamble_size_bits / 8)
+        self.burst_size_bytes = self.preamble_size_bytes + int(self.random_sequence_size_bits / 8)
+
+    @staticmethod
+    def payload(seed, length):
+        '''
+        Reproducible full-byte (0-255 inclusive) payload of length bytes
+        '''
+        return np.frombuffer(np.random.RandomState(seed).bytes(length), dtype=np.uint8)
+
+    def build(self, frame_id, number_of_instances, payload=None):
+        '''
+        Allocate a 'b' frame and fill it with a burst, from payload if given, else freshly drawn bytes
+        :return: Burst with views of the frame (no copies)
+        '''
+        frame = self.cbp.allocate_frame(frame_id, self.burst_size_bytes, 'b', number_of_instances, self.preamble_size_bytes)
+
+        if payload is None:
+            frame[:] = np.frombuffer(self.random.bytes(self.burst_size_bytes), dtype=np.uint8)
+        else:
+            frame[:] = payload[:self.burst_size_bytes]
+
+        self.cbp.commit_frame(frame_id)
+
+        # allocate_frame aligns the header, so the index comes from the table rather than active_pointer
+        frame_index = self.cbp.find_frame_index(frame_id)
+
+        return Burst(frame_id, frame_index, frame, frame[:self.preamble_size_bytes], frame[self.preamble_size_bytes:])
@@ -1,38 +1,64 @@
-from gnuradio import blocks
-from gnuradio import digital
-from modulations_pi4qpsk import *
+from collections import namedtuple, OrderedDict
 import math
-import numpy as np
+import os
 
 
 """
 These functions create and return blocks that modulate incoming data, producing symbols.
+GNU Radio is imported inside the factories, so the registry (names, bits per symbol) can be
+used without loading it, e.g. to populate the GUI before the first transmit.
 """
 
-mod_types = {
-    'discrete': ['BPSK', 'QPSK', '8PSK', '16PSK', 'QAM16', 'QAM32', 'QAM64', 'GFSK',
-                 'GMSK', 'QAM32', 'PI4QPSK'],
-    'none': ['NOISE']
-}
+
+# Modulation registry: one entry per modulation, in GUI order. Factories are only called for the
+# modulation actually used, so building a flowgraph constructs a single modulator.
+# factory(sps, excess_bw, sample_rate_hz) -> GNURadio block
+
+ModulationSpec = namedtuple("ModulationSpec", "name factory bits_per_symbol mod_type")
+
+# GFSK modulation index (GMSK is the h = 0.5 case); sensitivity follows from it and sps
+gfsk_modulation_index = 1.0
+
+# PI4QPSK is only offered when its modulator module is installed next to this one
+pi4qpsk_available = os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modulations_pi4qpsk.py'))
+
+registry = OrderedDict((spec.name, spec) for spec in [
+    ModulationSpec('BPSK', lambda sps, excess_bw, sample_rate_hz: bpsk(sps, excess_bw), 1.0, 'discrete'),
+    ModulationSpec('QPSK', lambda sps, excess_bw, sample_rate_hz: qpsk(sps, excess_bw), 2.0, 'discrete'),
+    ModulationSpec('8PSK', lambda sps, excess_bw, sample_rate_hz: psk8(sps, excess_bw), 3.0, 'discrete'),
+    ModulationSpec('16PSK', lambda sps, excess_bw, sample_rate_hz: psk16(sps, excess_bw), 4.0, 'discrete'),
+    ModulationSpec('QAM16', lambda sps, excess_bw, sample_rate_hz: qam16(sps, excess_bw), 4.0, 'discrete'),
+    ModulationSpec('QAM32', lambda sps, excess_bw, sample_rate_hz: qam32(sps, excess_bw), 5.0, 'discrete'),
+    ModulationSpec('QAM64', lambda sps, excess_bw, sample_rate_hz: qam64(sps, excess_bw), 6.0, 'discrete'),
+    ModulationSpec('PI4QPSK', lambda sps, excess_bw, sample_rate_hz: pi4qpsk(sample_rate_hz, sps, excess_bw), 2.0, 'discrete'),
+    ModulationSpec('GMSK', lambda sps, excess_bw, sample_rate_hz: gmsk(sps, excess_bw), 1.0, 'discrete'),
+    ModulationSpec('GFSK', lambda sps, excess_bw, sample_rate_hz: gfsk(sps, math.pi * gfsk_modulation_index / sps, excess_bw), 1.0, 'discrete'),
+    ModulationSpec('NOISE', lambda sps, excess_bw, sample_rate_hz: no_mod(), None, 'none'),
+] if spec.name != 'PI4QPSK' or pi4qpsk_available)
+
+mod_types = {}
+for spec in registry.values():
+    mod_types.setdefault(spec.mod_type, []).append(spec.name)
 
 
 def get_bits_per_symbol(modulation):
 
-    switch = {
-        "BPSK": np.log2(float(2)),
-        "QPSK": np.log2(float(4)),
-        "8PSK": np.log2(float(8)),
-        "16PSK": np.log2(float(16)),
-        "PI4QPSK": np.log2(float(4)),
-        "QAM16": np.log2(float(16)),
-        "GMSK": np.log2(float(2)),
-    }
+    spec = registry.get(modulation)
 
-    return switch.get(modulation, lambda: None)
+    return None if spec is None else spec.bits_per_symbol
 
 
+def make(modulation, sps, excess_bw=0.35, sample_rate_hz=None):
+    '''
+    Construct only the requested modulator block
+    :param modulation: registry name, e.g. 'QPSK'
+    :return: GNURadio block that modulates incoming bytes
+    '''
+    return registry[modulation].factory(sps, excess_bw, sample_rate_hz)
+
 
 def bpsk(sps, excess_bw=0.35):
+    from gnuradio import digital
     return digital.psk.psk_mod(
         constellation_points=2,
         mod_code="gray",
@@ -45,6 +71,7 @@ def bpsk(sps, excess_bw=0.35):
 
 
 def qpsk(sps, excess_bw=0.35):
+    from gnuradio import digital
     return digital.psk.psk_mod(
         constellation_points=4,
         mod_code="gray",
@@ -57,6 +84,7 @@ def qpsk(sps, excess_bw=0.35):
 
 
 def psk8(sps, excess_bw=0.35):
+    from gnuradio import digital
     return digital.psk.psk_mod(
         constellation_points=8,
         mod_code="gray",
@@ -69,6 +97,7 @@ def psk8(sps, excess_bw=0.35):
 
 
 def psk16(sps, excess_bw=0.35):
+    from gnuradio import digital
     return digital.psk.psk_mod(
         constellation_points=16,
         mod_code="gray",
@@ -81,6 +110,7 @@ def psk16(sps, excess_bw=0.35):
 
 
 def qam16(sps, excess_bw=0.35):
+    from gnuradio import digital
     return digital.qam.qam_mod(
         constellation_points=16,
         mod_code="gray",
@@ -93,6 +123,7 @@ def qam16(sps, excess_bw=0.35):
 
 
 def qam32(sps, excess_bw=0.35):
+    from gnuradio import digital
     qam32_constellation = digital.constellation_calcdist(([x / math.sqrt(20) for x in
                                                            [-3 + 5j, -1 + 5j, 1 + 5j, 3 + 5j, -5 + 3j, -3 + 3j, -1 + 3j,
                                                             1 + 3j, 3 + 3j, 5 + 3j, -5 + 1j, -3 + 1j, -1 + 1j, 1 + 1j,
@@ -115,6 +146,7 @@ def qam32(sps, excess_bw=0.35):
 
 
 def qam64(sps, excess_bw=0.35):
+    from gnuradio import digital
     return digital.qam.qam_mod(
         constellation_points=64,
         mod_code="gray",
@@ -126,7 +158,13 @@ def qam64(sps, excess_bw=0.35):
     )
 
 
+def pi4qpsk(sample_rate_hz, sps, excess_bw=0.35):
+    from modulations_pi4qpsk import Pi4DQPSKMod
+    return Pi4DQPSKMod(sample_rate_hz, sps, excess_bw)
+
+
 def gmsk(sps, excess_bw=0.35):
+    from gnuradio import digital
     return digital.gmsk_mod(
         samples_per_symbol=sps,
         bt=excess_bw,
@@ -136,6 +174,7 @@ def gmsk(sps, excess_bw=0.35):
 
 
 def gfsk(sps, sensitivity, excess_bw=0.35):
+    from gnuradio import digital
     return digital.gfsk_mod(
         samples_per_symbol=sps,
         sensitivity=sensitivity,
@@ -150,4 +189,5 @@ def no_mod():
     Creates a GNURadio block that passes through the incoming signal
     :return: GNURadio block that passes through data
     '''
+    from gnuradio import blocks
     return blocks.multiply_const_cc(1)
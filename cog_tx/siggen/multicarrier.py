@@ -0,0 +1,108 @@
+import math
+import numpy as np
+from collections import namedtuple
+from gnuradio import gr
+from gnuradio import blocks
+from gnuradio import filter
+import sources
+from sinks import make_sink
+import modulations
+from cog_tx.mem_manager.shmem import CarrierEntry
+
+
+"""
+Multi-carrier transmitter: several independently modulated carriers on a channel grid, combined into
+one wideband stream by a polyphase synthesis filterbank (filter.pfb_synthesizer_ccf). The filterbank
+upsamples and shifts all channels with one shared prototype filter and an FFT, instead of a full-rate
+resampler and mixer per carrier.
+"""
+
+# one emitter: frequency_offset_hz is snapped to the nearest multiple of the channel spacing
+Carrier = namedtuple("Carrier", "modulation_type symbol_rate_Bd frequency_offset_hz samples_per_symbol excess_bw")
+
+
+def carrier(modulation_type, symbol_rate_Bd, frequency_offset_hz, samples_per_symbol=2, excess_bw=0.35):
+    return Carrier(modulation_type, symbol_rate_Bd, frequency_offset_hz, samples_per_symbol, excess_bw)
+
+
+class multi_transmit(gr.top_block):
+
+    # class constants
+    antenna = 'TX/RX'
+    payload_size_bytes = 1312   # preamble + random sequence of transmit
+
+    # prototype filter: passband edge / transition width as fractions of the channel spacing
+    prototype_cutoff = 0.4
+    prototype_transition = 0.2
+    prototype_attenuation_dB = 80
+
+    def __init__(self, cbp, _tx_id, _center_freq_hz, _channel_spacing_hz, _carriers, _gain_dB, _duration_s, device_ip="192.168.10.2", _sink_type='usrp', _sink_file='tx_samples.c64'):
+
+        gr.top_block.__init__(self, "Multi-Carrier Top Block")
+
+        # save input parameters
+        self.cbp = cbp
+        self.frame_id = _tx_id
+        self.center_freq_hz = _center_freq_hz
+        self.channel_spacing_hz = float(_channel_spacing_hz)
+        self.carriers = list(_carriers)
+        self.gain_dB = _gain_dB
+
+        assert 0 < len(self.carriers) <= cbp.max_carriers, 'Between 1 and ' + str(cbp.max_carriers) + ' carriers are supported.'
+
+        # channel index of each carrier, and the smallest power of two filterbank that holds them all
+        self.channels = [int(round(c.frequency_offset_hz / self.channel_spacing_hz)) for c in self.carriers]
+        assert len(set(self.channels)) == len(self.channels), 'Carriers must be on distinct channels.'
+
+        span = 2 * max(abs(ch) for ch in self.channels) + 1
+        self.number_of_channels = max(2, 2 ** int(math.ceil(math.log(span, 2))))
+        self.sample_rate_hz = self.number_of_channels * self.channel_spacing_hz
+
+        # record carriers in the channel header
+        self.cbp.write_channel_header(center_frequency_hz=self.center_freq_hz, sample_rate_hz=self.sample_rate_hz)
+        self.cbp.write_carriers([CarrierEntry(ch, c.modulation_type, c.symbol_rate_Bd, ch * self.channel_spacing_hz, c.excess_bw, c.samples_per_symbol)
+                                 for ch, c in zip(self.channels, self.carriers)])
+
+        # synthesis filterbank, channel k comes out at k * channel spacing (negative k wrap around)
+        taps = filter.firdes.low_pass_2(self.number_of_channels, self.number_of_channels, self.prototype_cutoff,
+                                        self.prototype_transition, self.prototype_attenuation_dB)
+        self.synthesizer = filter.pfb_synthesizer_ccf(self.number_of_channels, taps, False)
+
+        # per-carrier chains: bytes -> modulator -> resample to the channel rate -> filterbank input
+        self.chains = []
+        used = set()
+        for k, (ch, c) in enumerate(zip(self.channels, self.carriers)):
+
+            occupied_bw = c.symbol_rate_Bd * (1 + c.excess_bw)
+            assert occupied_bw <= 2 * self.prototype_cutoff * self.channel_spacing_hz, \
+                'Carrier ' + str(k) + ' is wider than a filterbank channel.'
+
+            # each carrier's payload lives in its own frame and is streamed from there, no Python list copy
+            frame_id = self.frame_id * self.cbp.max_carriers + k
+            payload = np.random.randint(0, 256, self.payload_size_bytes).astype(np.uint8)
+            self.cbp.write_frame(frame_id, payload, 'b')
+
+            source = sources.shm_bytes(self.cbp, frame_id)
+            mod = modulations.make(c.modulation_type, c.samples_per_symbol, c.excess_bw, c.symbol_rate_Bd * c.samples_per_symbol)
+            rate = self.channel_spacing_hz / (c.symbol_rate_Bd * c.samples_per_symbol)
+            resampler = filter.pfb_arb_resampler_ccf(rate, filter.firdes.low_pass_2(32, 32, 0.4 * min(1.0, rate), 0.2 * min(1.0, rate), 60))
+
+            input_port = ch % self.number_of_channels
+            used.add(input_port)
+            self.connect(source, mod, resampler, (self.synthesizer, input_port))
+            self.chains.append((source, mod, resampler))
+
+        # idle channels
+        self.idle = []
+        for input_port in range(self.number_of_channels):
+            if input_port not in used:
+                idle = blocks.null_source(gr.sizeof_gr_complex * 1)
+                self.connect(idle, (self.synthesizer, input_port))
+                self.idle.append(idle)
+
+        # sink block
+        samples_to_tx = int(_duration_s * self.sample_rate_hz)
+        self.sink = make_sink(_sink_type, samples_to_tx, center_freq_hz=self.center_freq_hz, sample_rate_hz=self.sample_rate_hz, antenna=self.antenna,
+                              gain_dB=self.gain_dB, ipv4_address=device_ip, cbp=self.cbp, sink_file=_sink_file)
+
+        self.connect(self.synthesizer, self.sink)
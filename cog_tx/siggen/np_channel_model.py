@@ -0,0 +1,126 @@
+import math
+import numpy as np
+from collections import namedtuple
+
+
+"""
+Channel impairments for generated bursts: sample-rate offset, tapped-delay multipath, carrier frequency
+offset, phase noise and AWGN at a target Es/N0, applied in that order (transmitter clock, propagation,
+receiver oscillator, thermal noise). NumPy batch version, vectorised across samples and across bursts;
+channel_model.py has the GNU Radio block with the same parameters.
+"""
+
+# esn0_dB: symbol energy to noise density, None for no noise
+# cfo_hz: carrier frequency offset
+# phase_noise_rad: std of the per-sample phase increment (Wiener phase noise)
+# sro_ppm: sample-rate offset, the signal is resampled by 1 + sro_ppm * 1e-6
+# taps: complex gains of the tapped delay line, one sample apart, taps[0] is the direct path
+ChannelParams = namedtuple("ChannelParams", "esn0_dB cfo_hz phase_noise_rad sro_ppm taps")
+
+
+def channel_params(esn0_dB=None, cfo_hz=0.0, phase_noise_rad=0.0, sro_ppm=0.0, taps=(1.0,)):
+    return ChannelParams(esn0_dB, cfo_hz, phase_noise_rad, sro_ppm, tuple(taps))
+
+
+# ideal channel
+passthrough = channel_params()
+
+
+def noise_sigma(signal_power, samples_per_symbol, esn0_dB):
+    '''
+    :param signal_power: mean |x|^2 per sample
+    :return: std of each of the real and imaginary noise components for the target Es/N0
+    '''
+    if esn0_dB is None:
+        return 0.0
+
+    es = signal_power * samples_per_symbol
+    return math.sqrt(es / 10 ** (esn0_dB / 10.0) / 2)
+
+
+def complex_noise(rng, shape, sigma):
+    '''
+    :return: complex64 gaussian noise, sigma per component
+    '''
+    n = rng.standard_normal(tuple(shape) + (2,)).astype(np.float32).view(np.complex64)[..., 0]
+    return n * np.asarray(sigma, dtype=np.float32)
+
+
+def resample(x, ratio):
+    '''
+    Sample-rate offset: out[n] = x(n * ratio) by linear interpolation, same length as x. Positions past
+    the end hold the last sample; callers that need exact tails pass sro_margin() extra samples and trim.
+    '''
+    position = np.arange(len(x)) * ratio
+    index = np.arange(len(x))
+    out = np.empty(len(x), dtype=np.complex64)
+    out.real = np.interp(position, index, x.real)
+    out.imag = np.interp(position, index, x.imag)
+    return out
+
+
+def sro_margin(length, sro_ppm):
+    '''
+    :return: extra input samples needed for resample() to cover length output samples without running off the end
+    '''
+    return int(math.ceil(length * max(sro_ppm, 0) * 1e-6)) + 1 if sro_ppm else 0
+
+
+def apply_bursts(bursts, params, sample_rate_hz, samples_per_symbol, rng=None):
+    '''
+    Impair a batch of equal length bursts, each with its own parameters
+    :param bursts: M x N complex samples
+    :param params: ChannelParams, one per burst or a single one for all
+    :param rng: numpy RandomState / Generator, np.random if None
+    :return: M x N complex64 impaired bursts
+    '''
+    rng = np.random if rng is None else rng
+    x = np.array(bursts, dtype=np.complex64, ndmin=2)
+    m, n = x.shape
+
+    if isinstance(params, ChannelParams):
+        params = [params] * m
+    assert len(params) == m, 'One ChannelParams per burst is required.'
+
+    # sample-rate offset, per burst
+    for i, p in enumerate(params):
+        if p.sro_ppm:
+            x[i] = resample(x[i], 1 + p.sro_ppm * 1e-6)
+
+    # multipath: one shifted multiply-add per delay across all bursts
+    taps_length = max(len(p.taps) for p in params)
+    taps = np.zeros((m, taps_length), dtype=np.complex64)
+    for i, p in enumerate(params):
+        taps[i, :len(p.taps)] = p.taps
+
+    if taps_length > 1 or np.any(taps[:, 0] != 1):
+        y = x * taps[:, 0, None]
+        for k in range(1, min(taps_length, n)):
+            y[:, k:] += taps[:, k, None] * x[:, :n - k]
+        x = y
+
+    # frequency offset and phase noise as one rotation
+    w = np.array([2 * math.pi * p.cfo_hz / sample_rate_hz for p in params])
+    phase_noise = np.array([p.phase_noise_rad for p in params])
+
+    if np.any(w) or np.any(phase_noise):
+        phase = w[:, None] * np.arange(n)
+        if np.any(phase_noise):
+            phase += np.cumsum(rng.standard_normal((m, n)) * phase_noise[:, None], axis=1)
+        x *= np.exp(1j * phase).astype(np.complex64)
+
+    # AWGN relative to each burst's own power
+    sigma = np.array([noise_sigma(np.mean(np.abs(x[i]) ** 2), samples_per_symbol, p.esn0_dB) for i, p in enumerate(params)])
+
+    if np.any(sigma):
+        x += complex_noise(rng, (m, n), sigma[:, None])
+
+    return x
+
+
+def apply(samples, params, sample_rate_hz, samples_per_symbol, rng=None):
+    '''
+    Impair one burst
+    :return: complex64 samples, same length as samples
+    '''
+    return apply_bursts(np.asarray(samples)[None, :], params, sample_rate_hz, samples_per_symbol, rng)[0]
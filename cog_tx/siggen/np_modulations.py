@@ -0,0 +1,305 @@
+import math
+import numpy as np
+
+
+"""
+Pure NumPy versions of the modulators in modulations.py. Each function takes packed bytes (the same
+stream the GNU Radio source block feeds the modulator) and returns the complex64 baseband samples in
+one vectorised call, so waveforms can be generated offline without building a flowgraph.
+
+The chains mirror gnuradio.digital.generic_mod: MSB-first unpacking into k-bit symbols, optional
+pre-differential code, differential encoding mod 2^k, constellation mapping, and root raised cosine
+pulse shaping with the 11-symbol-per-phase filter the polyphase resampler uses.
+
+With periodic=True (modulate_periodic) the output is one period of the steady-state waveform the
+modulator produces for the data repeated forever: the filters wrap around and the data is repeated
+until the differential encoder / frequency modulator phase returns to its start, so the samples can be
+looped without a seam.
+"""
+
+
+# --- shared building blocks --- #
+
+def gray_code(n):
+    '''
+    :return: gray code of each index 0..n-1
+    '''
+    i = np.arange(n)
+    return i ^ (i >> 1)
+
+
+def invert_code(code):
+    '''
+    :return: inverse permutation of code
+    '''
+    inverse = np.empty(len(code), dtype=np.int64)
+    inverse[np.asarray(code)] = np.arange(len(code))
+    return inverse
+
+
+def rrc_taps(gain, sampling_freq, symbol_rate, alpha, ntaps):
+    '''
+    Root raised cosine taps, same formula and normalisation as gnuradio filter.firdes.root_raised_cosine
+    :return: float64 taps summing to gain
+    '''
+    ntaps = int(ntaps) | 1
+    spb = float(sampling_freq) / symbol_rate
+    xindx = (np.arange(ntaps) - ntaps // 2).astype(np.float64)
+
+    x1 = np.pi * xindx / spb
+    x2 = 4 * alpha * xindx / spb
+    x3 = x2 * x2 - 1
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+
+        # regular points
+        num = np.where(xindx != 0,
+                       np.cos((1 + alpha) * x1) + np.sin((1 - alpha) * x1) / (4 * alpha * xindx / spb),
+                       np.cos((1 + alpha) * x1) + (1 - alpha) * np.pi / (4 * alpha))
+        den = x3 * np.pi
+
+        # points where the formula is 0/0
+        singular = np.abs(x3) < 0.000001
+        s3 = (1 - alpha) * x1
+        s2 = (1 + alpha) * x1
+        singular_num = (np.sin(s2) * (1 + alpha) * np.pi
+                        - np.cos(s3) * ((1 - alpha) * np.pi * spb) / (4 * alpha * xindx)
+                        + np.sin(s3) * spb * spb / (4 * alpha * xindx * xindx))
+        singular_den = -32 * np.pi * alpha * alpha * xindx / spb
+
+        taps = np.where(singular, 4 * alpha * singular_num / singular_den, 4 * alpha * num / den)
+
+    if alpha == 1:
+        taps[singular] = -1
+
+    return taps * gain / taps.sum()
+
+
+def gaussian_taps(gain, spb, bt, ntaps):
+    '''
+    Gaussian taps, same formula and normalisation as gnuradio filter.firdes.gaussian
+    '''
+    s = 1.0 / (math.sqrt(math.log(2.0)) / (2 * math.pi * bt))
+    ts = s * (1.0 / spb) * (-0.5 * ntaps + np.arange(1, ntaps + 1))
+    taps = np.exp(-0.5 * ts * ts)
+    return taps / taps.sum() * gain
+
+
+_taps_cache = {}
+
+
+def pulse_shape_taps(sps, excess_bw):
+    '''
+    Effective interpolation filter of generic_mod's pfb_arb_resampler (32 filters, 11*sps taps each)
+    at an integer samples per symbol. Memoized, the filter design only runs once per setting.
+    '''
+    key = (int(sps), float(excess_bw))
+    if key not in _taps_cache:
+        nfilts = 32
+        taps = rrc_taps(nfilts, nfilts, 1.0, excess_bw, nfilts * 11 * int(sps))
+        if nfilts % int(sps) == 0:
+            taps = taps[::nfilts // int(sps)]
+        else:
+            taps = rrc_taps(sps, sps, 1.0, excess_bw, 11 * int(sps) * int(sps))
+        _taps_cache[key] = taps.astype(np.float32)
+
+    return _taps_cache[key]
+
+
+def unpack_symbols(data, bits_per_symbol):
+    '''
+    Bytes -> k-bit symbols, MSB first (blocks.packed_to_unpacked_bb with GR_MSB_FIRST, which
+    takes k bits at a time across byte boundaries)
+    '''
+    bits = np.unpackbits(np.asarray(data, dtype=np.uint8))
+    bits = bits[:len(bits) - len(bits) % bits_per_symbol].reshape(-1, bits_per_symbol)
+    weights = 1 << np.arange(bits_per_symbol - 1, -1, -1)
+    return bits.dot(weights).astype(np.int64)
+
+
+def differential_encode(symbols, arity):
+    '''
+    digital.diff_encoder_bb: out[i] = (in[i] + out[i-1]) mod arity, starting from 0
+    '''
+    return np.cumsum(symbols) % arity
+
+
+def interpolate(symbols, taps, sps, dtype=np.complex64, circular=False):
+    '''
+    Polyphase interpolation by sps: one short convolution per output phase instead of filtering the zero-stuffed stream
+    :param circular: filter state wraps around (symbols are one period of an endless stream) instead of starting at zero
+    '''
+    sps = int(sps)
+    n = len(symbols)
+    out = np.empty(n * sps, dtype=dtype)
+    for phase in range(sps):
+        phase_taps = taps[phase::sps]
+        history = len(phase_taps) - 1 if circular else 0
+        if history:
+            symbols_in = np.concatenate((np.tile(symbols, history // n + 1)[-history:], symbols))
+        else:
+            symbols_in = symbols
+        out[phase::sps] = np.convolve(symbols_in, phase_taps)[history:history + n]
+    return out
+
+
+def repeat_to_whole_symbols(data, bits_per_symbol):
+    '''
+    Repeat packed bytes until they hold a whole number of k-bit symbols (the byte stream a repeating source
+    feeds the modulator, cut at the first point where bytes and symbols line up again)
+    '''
+    data = np.asarray(data, dtype=np.uint8)
+    bits = 8 * len(data)
+    return np.tile(data, bits_per_symbol // int(np.gcd(bits, bits_per_symbol)))
+
+
+def linear_mod(data, points, sps, excess_bw, pre_diff_code=None, differential=True, periodic=False):
+    '''
+    generic_mod: unpack -> pre diff code -> differential encode -> map to points -> pulse shape
+    '''
+    points = np.asarray(points, dtype=np.complex64)
+    arity = len(points)
+    bits_per_symbol = int(round(math.log(arity, 2)))
+
+    if periodic:
+        data = repeat_to_whole_symbols(data, bits_per_symbol)
+
+    symbols = unpack_symbols(data, bits_per_symbol)
+
+    if pre_diff_code is not None and len(pre_diff_code):
+        symbols = np.asarray(pre_diff_code)[symbols]
+
+    if differential:
+
+        # each pass of the data advances the encoder state by sum(symbols); repeat until it is back to 0
+        if periodic:
+            symbols = np.tile(symbols, arity // int(np.gcd(int(symbols.sum()) % arity, arity)))
+
+        symbols = differential_encode(symbols, arity)
+
+    return interpolate(points[symbols], pulse_shape_taps(sps, excess_bw), sps, circular=periodic)
+
+
+# --- constellations (point order as built by gnuradio digital.psk / digital.qam) --- #
+
+def psk_points(m):
+    points = np.exp(2j * np.pi * np.arange(m) / m)
+    if m > 2:
+        points = points[invert_code(gray_code(m))]
+    return points
+
+
+def differential_qam_points(m):
+    # digital.qam.make_differential_constellation with gray coding: the top two bits pick the quadrant,
+    # the remaining bits the gray coded x/y position inside it
+    k = int(round(math.log(m, 2)))
+    side = int(math.sqrt(m) / 2)
+    step = 1 / (side - 0.5)
+    gc_to_x = (invert_code(gray_code(side)) + 0.5) * step
+
+    half = (k - 2) // 2
+    i = np.arange(m)
+    y = gc_to_x[i % (1 << half)]
+    x = gc_to_x[(i >> half) % (1 << half)]
+    quad = (i >> (k - 2)) % 4
+
+    return np.select([quad == 0, quad == 1, quad == 2, quad == 3],
+                     [x + 1j * y, -y + 1j * x, -x - 1j * y, y - 1j * x])
+
+
+QAM32_POINTS = np.array([-3 + 5j, -1 + 5j, 1 + 5j, 3 + 5j, -5 + 3j, -3 + 3j, -1 + 3j, 1 + 3j, 3 + 3j, 5 + 3j,
+                         -5 + 1j, -3 + 1j, -1 + 1j, 1 + 1j, 3 + 1j, 5 + 1j, -5 - 1j, -3 - 1j, -1 - 1j, 1 - 1j,
+                         3 - 1j, 5 - 1j, -5 - 3j, -3 - 3j, -1 - 3j, 1 - 3j, 3 - 3j, 5 - 3j, -3 - 5j, -1 - 5j,
+                         1 - 5j, 3 - 5j]) / math.sqrt(20)
+
+QAM32_PRE_DIFF_CODE = [0, 1, 29, 28, 4, 8, 12, 16, 20, 24, 5, 9, 13, 17, 21, 25, 6,
+                       10, 14, 18, 22, 26, 7, 11, 15, 19, 23, 27, 3, 2, 30, 31]
+
+
+# --- modulators (same names and defaults as modulations.py, data first) --- #
+
+def bpsk(data, sps, excess_bw=0.35, periodic=False):
+    return linear_mod(data, psk_points(2), sps, excess_bw, periodic=periodic)
+
+
+def qpsk(data, sps, excess_bw=0.35, periodic=False):
+    return linear_mod(data, psk_points(4), sps, excess_bw, periodic=periodic)
+
+
+def psk8(data, sps, excess_bw=0.35, periodic=False):
+    return linear_mod(data, psk_points(8), sps, excess_bw, periodic=periodic)
+
+
+def psk16(data, sps, excess_bw=0.35, periodic=False):
+    return linear_mod(data, psk_points(16), sps, excess_bw, periodic=periodic)
+
+
+def qam16(data, sps, excess_bw=0.35, periodic=False):
+    return linear_mod(data, differential_qam_points(16), sps, excess_bw, periodic=periodic)
+
+
+def qam32(data, sps, excess_bw=0.35, periodic=False):
+    return linear_mod(data, QAM32_POINTS, sps, excess_bw, pre_diff_code=QAM32_PRE_DIFF_CODE, periodic=periodic)
+
+
+def qam64(data, sps, excess_bw=0.35, periodic=False):
+    return linear_mod(data, differential_qam_points(64), sps, excess_bw, periodic=periodic)
+
+
+# repeats of the data tried for the frequency modulator's phase to close (GMSK needs at most 2)
+max_phase_repeats = 4
+
+
+def gfsk(data, sps, sensitivity, excess_bw=0.35, periodic=False):
+    '''
+    digital.gfsk_mod / gmsk_mod: NRZ bits -> gaussian (bt = excess_bw) * rect interpolation -> frequency modulator
+    '''
+    sps = int(sps)
+    nrz = np.unpackbits(np.asarray(data, dtype=np.uint8)).astype(np.float32) * 2 - 1
+
+    taps = np.convolve(gaussian_taps(1.0, sps, excess_bw, 4 * sps), np.ones(sps))
+
+    if periodic:
+
+        # one pass of the data turns the phase by sensitivity * sum(taps) * sum(nrz); repeat until a multiple of 2 pi
+        turn = sensitivity * taps.sum() * nrz.sum()
+        repeats = [p for p in range(1, max_phase_repeats + 1) if abs((p * turn + math.pi) % (2 * math.pi) - math.pi) < 1e-6]
+        if not repeats:
+            raise ValueError('Phase does not return to its start within ' + str(max_phase_repeats) + ' repeats of the data.')
+        nrz = np.tile(nrz, repeats[0])
+
+    freq = interpolate(nrz, taps, sps, dtype=np.float64, circular=periodic)
+
+    return np.exp(1j * sensitivity * np.cumsum(freq)).astype(np.complex64)
+
+
+def gmsk(data, sps, excess_bw=0.35, periodic=False):
+    return gfsk(data, sps, (math.pi / 2) / sps, excess_bw, periodic)
+
+
+modulators = {
+    'BPSK': bpsk,
+    'QPSK': qpsk,
+    '8PSK': psk8,
+    '16PSK': psk16,
+    'QAM16': qam16,
+    'QAM32': qam32,
+    'QAM64': qam64,
+    'GMSK': gmsk,
+}
+
+
+def modulate(modulation_type, data, sps, excess_bw=0.35):
+    '''
+    Modulate packed bytes with the named modulation (GUI names, e.g. 'QPSK')
+    :return: complex64 samples, len(data) * 8 / bits_per_symbol * sps of them
+    '''
+    return modulators[modulation_type](data, sps, excess_bw)
+
+
+def modulate_periodic(modulation_type, data, sps, excess_bw=0.35):
+    '''
+    Steady-state waveform of the data repeated forever, safe to loop sample for sample
+    :return: complex64 samples, a whole number of repeats of data (raises ValueError if the phase never closes)
+    '''
+    return modulators[modulation_type](data, sps, excess_bw, periodic=True)
@@ -0,0 +1,6 @@
+"""
+Sink backends accepted by sinks.make_sink / make_stream_sink. Kept apart from sinks.py so the GUI can
+list them without importing GNU Radio.
+"""
+
+sink_types = ('usrp', 'null', 'file', 'shm', 'throttle')
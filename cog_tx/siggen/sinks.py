@@ -2,9 +2,12 @@ from gnuradio import analog
 from gnuradio import blocks
 from gnuradio import gr
 from gnuradio import uhd
-from gnuradio import channels
+import pmt
+import time
 from random import getrandbits
 from random import randint
+import numpy as np
+from sink_names import sink_types
 
 
 def usrp_sink(center_freq_hz, sample_rate_hz, antenna, gain_dB, ipv4_address):
@@ -44,18 +47,18 @@ class usrp_head_sink(gr.hier_block2):
 
 class snr_usrp(gr.hier_block2):
 
-    def __init__(self, values, snr_reference):
+    def __init__(self, snr, snr_reference, center_freq_hz, sample_rate_hz, antenna, gain_dB, ipv4_address):
         gr.hier_block2.__init__(
             self, "snr_usrp_sink",
             gr.io_signature(1, 1, gr.sizeof_gr_complex * 1),
             gr.io_signature(0, 0, 0),
         )
 
-        noise_amp = 10 ** (-values['snr'] / (snr_reference * 20.0))
+        noise_amp = 10 ** (-snr / (snr_reference * 20.0))
 
         self.add = blocks.add_vcc(1)
         self.noise_source = analog.fastnoise_source_c(analog.GR_GAUSSIAN, noise_amp, 0, 8192)
-        self.u = usrp_sink(values)
+        self.u = usrp_sink(center_freq_hz, sample_rate_hz, antenna, gain_dB, ipv4_address)
 
         self.connect(self.noise_source, (self.add, 0), self.u)
         self.connect(self, (self.add, 1))
@@ -82,3 +85,286 @@ class snr_head_file(gr.hier_block2):
         self.connect(self, (self.add, 1))
 
 
+class shm_sink(gr.sync_block):
+    '''
+    Sink that writes complex64 samples straight into a shared memory channel.
+
+    With N given, a frame of type 'c' holding N samples is allocated and filled in place; the block
+    signals WORK_DONE once it is full. Without N the samples are streamed into the channel's ring buffer.
+    '''
+
+    def __init__(self, cbp, frame_id=0, N=None):
+        gr.sync_block.__init__(
+            self, name="shm_sink",
+            in_sig=[np.complex64],
+            out_sig=None,
+        )
+
+        self.cbp = cbp
+        self.items_written = 0
+
+        if N is None:
+            self.frame = None
+            if self.cbp.ring_capacity == 0:
+                self.cbp.configure_ring()
+        else:
+            self.frame_id = frame_id
+            self.frame = self.cbp.allocate_frame(frame_id, N, 'c')
+
+    def work(self, input_items, output_items):
+        in0 = input_items[0]
+
+        # stream mode: ring write is a single copy (chunked only if a burst exceeds the ring)
+        if self.frame is None:
+            step = self.cbp.ring_capacity // in0.itemsize
+            for i in range(0, len(in0), step):
+                self.cbp.write_ring(in0[i:i + step])
+            self.items_written += len(in0)
+            return len(in0)
+
+        # frame mode: slice copy into the frame view
+        n = min(len(in0), len(self.frame) - self.items_written)
+        if n == 0:
+            return -1  # WORK_DONE
+
+        self.frame[self.items_written:self.items_written + n] = in0[:n]
+        self.items_written += n
+
+        # readers see the frame only once it is full
+        if self.items_written == len(self.frame):
+            self.cbp.commit_frame(self.frame_id)
+
+        return n
+
+
+class count_sink(gr.sync_block):
+    '''
+    Sink that discards complex samples and only counts them
+    '''
+
+    def __init__(self):
+        gr.sync_block.__init__(
+            self, name="count_sink",
+            in_sig=[np.complex64],
+            out_sig=None,
+        )
+
+        self.items_received = 0
+
+    def work(self, input_items, output_items):
+        self.items_received += len(input_items[0])
+        return len(input_items[0])
+
+
+class telemetry_sink(gr.sync_block):
+    '''
+    Counts the samples going to the transmit sink and publishes them, with elapsed time, UHD underruns
+    and completion, into the channel header's telemetry area (shm_mem.write_telemetry) at most every
+    publish_interval_s. Connect the USRP's async_msgs port to its async_msgs port to count underruns.
+
+    It sits beside the sink on the same fan-out, so samples_produced counts samples the chain has handed
+    to the sink, not samples the radio has sent: it runs ahead by whatever the sink and UHD have buffered.
+    '''
+
+    publish_interval_s = 0.1
+
+    # uhd async event codes: EVENT_CODE_UNDERFLOW, EVENT_CODE_UNDERFLOW_IN_PACKET (0x4 is a sequence error)
+    underrun_event_codes = (0x2, 0x10)
+    # the same events when the usrp block reports event_code as a list of symbols
+    underrun_event_names = ('underflow', 'underflow_in_packet')
+
+    def __init__(self, cbp, N=None):
+        gr.sync_block.__init__(
+            self, name="telemetry_sink",
+            in_sig=[np.complex64],
+            out_sig=None,
+        )
+
+        self.cbp = cbp
+        self.N = N
+        self.items_received = 0
+        self.underruns = 0
+        self.start_time = 0.0
+        self.last_publish = 0.0
+
+        self.message_port_register_in(pmt.intern('async_msgs'))
+        self.set_msg_handler(pmt.intern('async_msgs'), self.handle_async_msg)
+
+    def handle_async_msg(self, msg):
+        # plain dict, or (symbol . dict) pair depending on the gr-uhd version; pmt.is_dict is true for both
+        metadata = pmt.cdr(msg) if pmt.is_pair(msg) and pmt.is_symbol(pmt.car(msg)) else msg
+        if not pmt.is_dict(metadata):
+            return
+
+        # event_code is an integer, or a list of event name symbols
+        event_code = pmt.dict_ref(metadata, pmt.intern('event_code'), pmt.PMT_NIL)
+        if pmt.is_integer(event_code):
+            if pmt.to_long(event_code) in self.underrun_event_codes:
+                self.underruns += 1
+            return
+
+        names = []
+        while pmt.is_pair(event_code):
+            names.append(pmt.car(event_code))
+            event_code = pmt.cdr(event_code)
+        names.append(event_code)
+
+        if any(pmt.is_symbol(name) and pmt.symbol_to_string(name) in self.underrun_event_names for name in names):
+            self.underruns += 1
+
+    def start(self):
+        self.start_time = time.time()
+        self.cbp.write_telemetry('running', 0, self.start_time)
+        return True
+
+    def work(self, input_items, output_items):
+        n = len(input_items[0])
+
+        # finish together with the sink's head block, or the fanout would keep the graph running
+        if self.N is not None:
+            n = min(n, self.N - self.items_received)
+            if n == 0:
+                return -1  # WORK_DONE
+
+        self.items_received += n
+
+        now = time.time()
+        if now - self.last_publish >= self.publish_interval_s:
+            self.cbp.write_telemetry('running', self.items_received, self.start_time, self.underruns)
+            self.last_publish = now
+
+        return n
+
+    def stop(self):
+        # stopped with everything sent (head block done) or halted early
+        state = 'complete' if self.N is not None and self.items_received >= self.N else 'halted'
+        self.cbp.write_telemetry(state, self.items_received, self.start_time, self.underruns)
+        return True
+
+
+class null_head_sink(gr.hier_block2):
+
+    def __init__(self, N):
+        gr.hier_block2.__init__(
+            self, "null_head_sink",
+            gr.io_signature(1, 1, gr.sizeof_gr_complex * 1),
+            gr.io_signature(0, 0, 0),
+        )
+
+        self.head = blocks.head(gr.sizeof_gr_complex * 1, N)
+        self.counter = count_sink()
+
+        self.connect(self, self.head, self.counter)
+
+
+class file_head_sink(gr.hier_block2):
+
+    def __init__(self, sink_file, N):
+        gr.hier_block2.__init__(
+            self, "file_head_sink",
+            gr.io_signature(1, 1, gr.sizeof_gr_complex * 1),
+            gr.io_signature(0, 0, 0),
+        )
+
+        self.head = blocks.head(gr.sizeof_gr_complex * 1, N)
+        self.file_sink = blocks.file_sink(gr.sizeof_gr_complex * 1, sink_file, False)
+        self.file_sink.set_unbuffered(False)
+
+        self.connect(self, self.head, self.file_sink)
+
+
+class shm_head_sink(gr.hier_block2):
+
+    def __init__(self, cbp, N):
+        gr.hier_block2.__init__(
+            self, "shm_head_sink",
+            gr.io_signature(1, 1, gr.sizeof_gr_complex * 1),
+            gr.io_signature(0, 0, 0),
+        )
+
+        self.head = blocks.head(gr.sizeof_gr_complex * 1, N)
+        self.shm = shm_sink(cbp)
+
+        self.connect(self, self.head, self.shm)
+
+
+class throttled_head_sink(gr.hier_block2):
+    '''
+    Stands in for the USRP: consumes samples at the device sample clock and counts them
+    '''
+
+    def __init__(self, sample_rate_hz, N):
+        gr.hier_block2.__init__(
+            self, "throttled_head_sink",
+            gr.io_signature(1, 1, gr.sizeof_gr_complex * 1),
+            gr.io_signature(0, 0, 0),
+        )
+
+        self.head = blocks.head(gr.sizeof_gr_complex * 1, N)
+        self.throttle = blocks.throttle(gr.sizeof_gr_complex * 1, sample_rate_hz, True)
+        self.counter = count_sink()
+
+        self.connect(self, self.head, self.throttle, self.counter)
+
+
+class throttled_sink(gr.hier_block2):
+    '''
+    Unbounded throttled_head_sink, for flowgraphs that manage their own head block
+    '''
+
+    def __init__(self, sample_rate_hz):
+        gr.hier_block2.__init__(
+            self, "throttled_sink",
+            gr.io_signature(1, 1, gr.sizeof_gr_complex * 1),
+            gr.io_signature(0, 0, 0),
+        )
+
+        self.throttle = blocks.throttle(gr.sizeof_gr_complex * 1, sample_rate_hz, True)
+        self.counter = count_sink()
+
+        self.connect(self, self.throttle, self.counter)
+
+    def set_sample_rate(self, sample_rate_hz):
+        self.throttle.set_sample_rate(sample_rate_hz)
+
+
+def make_sink(sink_type, N, center_freq_hz, sample_rate_hz, antenna, gain_dB, ipv4_address, cbp=None, sink_file='tx_samples.c64'):
+    '''
+    Create the sink block a transmitter feeds; every sink stops after N samples
+    :param sink_type: one of sink_types
+    :return: GNURadio hier block with one complex input
+    '''
+    if sink_type == 'usrp':
+        return usrp_head_sink(center_freq_hz=center_freq_hz, sample_rate_hz=sample_rate_hz, antenna=antenna, gain_dB=gain_dB, ipv4_address=ipv4_address, N=N)
+    if sink_type == 'null':
+        return null_head_sink(N)
+    if sink_type == 'file':
+        return file_head_sink(sink_file, N)
+    if sink_type == 'shm':
+        return shm_head_sink(cbp, N)
+    if sink_type == 'throttle':
+        return throttled_head_sink(sample_rate_hz, N)
+
+    raise ValueError('Unknown sink type: ' + str(sink_type))
+
+
+def make_stream_sink(sink_type, center_freq_hz, sample_rate_hz, antenna, gain_dB, ipv4_address, cbp=None, sink_file='tx_samples.c64'):
+    '''
+    Same backends as make_sink without the head block, for flowgraphs that are rerun with new lengths.
+    The usrp sink can be retuned live (set_center_freq / set_gain / set_samp_rate), the throttled sink
+    follows set_sample_rate.
+    '''
+    if sink_type == 'usrp':
+        return usrp_sink(center_freq_hz, sample_rate_hz, antenna, gain_dB, ipv4_address)
+    if sink_type == 'null':
+        return count_sink()
+    if sink_type == 'file':
+        file_sink = blocks.file_sink(gr.sizeof_gr_complex * 1, sink_file, False)
+        file_sink.set_unbuffered(False)
+        return file_sink
+    if sink_type == 'shm':
+        return shm_sink(cbp)
+    if sink_type == 'throttle':
+        return throttled_sink(sample_rate_hz)
+
+    raise ValueError('Unknown sink type: ' + str(sink_type))
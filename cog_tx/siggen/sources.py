@@ -34,3 +34,79 @@ def noise(noise_amp):
     :return type: GNURadio blocks.vector_source_b block
     '''
     return analog.fastnoise_source_c(analog.GR_GAUSSIAN, noise_amp, 0, 8192)
+
+
+def samples(vector):
+    '''
+    function to create and return a GNURadio source block that repeats precomputed baseband samples
+    :param vector: complex64 samples of one burst
+    :return : block that outputs the burst over and over
+    :return type: GNURadio blocks.vector_source_c block
+    '''
+    return blocks.vector_source_c(vector, True)
+
+
+class stream_bytes(gr.sync_block):
+    '''
+    Byte source that streams from an existing uint8 buffer (shared memory frame view or memory-mapped
+    file) without copying it into a Python list; each work call is one slice copy into the output buffer.
+    '''
+
+    def __init__(self, data, repeat=True):
+        gr.sync_block.__init__(
+            self, name="stream_bytes",
+            in_sig=None,
+            out_sig=[np.uint8],
+        )
+
+        self.data = data
+        self.repeat = repeat
+        self.position = 0
+
+    def work(self, input_items, output_items):
+        out = output_items[0]
+        produced = 0
+
+        while produced < len(out):
+
+            if self.position == len(self.data):
+                if not self.repeat or len(self.data) == 0:
+                    break
+                self.position = 0
+
+            n = min(len(out) - produced, len(self.data) - self.position)
+            out[produced:produced + n] = self.data[self.position:self.position + n]
+            produced += n
+            self.position += n
+
+        if produced == 0:
+            return -1  # WORK_DONE
+
+        return produced
+
+
+def shm_bytes(cbp, frame_id, repeat=True):
+    '''
+    function to create and return a GNURadio source block that streams a shared memory frame
+    :param cbp: shm_mem channel holding the frame
+    :param frame_id: id of a 'b' (bytes) or 'p' (packed bits) frame
+    :return : block that outputs the frame payload, looping if repeat
+    :return type: stream_bytes block
+    '''
+    frame_header = cbp.find_frame(frame_id)
+    assert frame_header is not None, 'Frame ' + str(frame_id) + ' not found in shared memory.'
+
+    data = cbp.read_frame(frame_header)
+    assert data.dtype == np.uint8, 'Frame ' + str(frame_id) + ' does not hold bytes.'
+
+    return stream_bytes(data, repeat)
+
+
+def file_bytes(path, repeat=True, offset=0):
+    '''
+    function to create and return a GNURadio source block that streams a memory-mapped payload file
+    :param path: file of raw payload bytes
+    :return : block that outputs the file contents, looping if repeat; pages are read on demand
+    :return type: stream_bytes block
+    '''
+    return stream_bytes(np.memmap(path, dtype=np.uint8, mode='r', offset=offset), repeat)
@@ -0,0 +1,125 @@
+from __future__ import print_function    # (at top of module)
+
+import json
+import os
+import threading
+import time
+import zlib
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+"""
+Transmit event log. Callers hand over small dict records; a background thread appends them as JSON
+lines, so no file I/O happens on the caller's (GUI) thread and every transmission is kept.
+Payloads are not written out: records carry a CRC32 and a reference to the shared memory frame.
+
+The log goes to ~/.cog_tx/tx_log.jsonl unless a path is given (or set in COG_TX_LOG); the file is only
+created when the first record is written.
+"""
+
+
+def _plain(value):
+    # namedtuples -> dicts, bytes -> str, numpy scalars -> python numbers
+    if hasattr(value, '_asdict'):
+        return dict((k, _plain(v)) for k, v in value._asdict().items())
+    if isinstance(value, dict):
+        return dict((k, _plain(v)) for k, v in value.items())
+    if isinstance(value, bytes):
+        return value.decode()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+class tx_log(object):
+
+    path = os.environ.get('COG_TX_LOG', os.path.join(os.path.expanduser('~'), '.cog_tx', 'tx_log.jsonl'))
+
+    def __init__(self, path=None):
+
+        if path is not None:
+            self.path = path
+
+        self.queue = queue.Queue()
+        self.records_written = 0
+
+        self.thread = threading.Thread(target=self._writer, name='tx_log')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def log(self, event, **fields):
+        '''
+        Queue one record, returns immediately
+        '''
+        record = {'event': event, 'timestamp': time.time()}
+        record.update(fields)
+        self.queue.put(record)
+
+    def log_transmit(self, parameters, channel_header, frame_header, frame_index, payload):
+        '''
+        Record a transmission: parameters, headers, payload checksum and where the payload lives
+        '''
+        self.log('transmit',
+                 parameters=parameters,
+                 channel_header=channel_header,
+                 frame_header=frame_header,
+                 payload_crc32=zlib.crc32(payload.tobytes()) & 0xffffffff,
+                 payload_reference={'channel_id': channel_header.channel_id,
+                                    'frame_id': frame_header.frame_id,
+                                    'frame_index': frame_index,
+                                    'length': frame_header.length})
+
+    def _open(self):
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        return open(self.path, 'a')
+
+    def _writer(self):
+
+        log_file = None
+
+        while True:
+            record = self.queue.get()
+
+            try:
+                if record is None:
+                    break
+
+                # opened on the first record, so a window that never transmits creates no file
+                if log_file is None:
+                    log_file = self._open()
+
+                log_file.write(json.dumps(_plain(record)) + '\n')
+
+                # flush once the queue has drained, not per record
+                if self.queue.empty():
+                    log_file.flush()
+
+                self.records_written += 1
+
+            # a bad record or a failed write drops that record only; flush() must never hang on it
+            except Exception as e:
+                print('---- tx_log: dropped ' + str(record.get('event')) + ' record: ' + str(e))
+
+            finally:
+                self.queue.task_done()
+
+        if log_file is not None:
+            log_file.close()
+
+    def flush(self):
+        '''
+        Block until every queued record is on disk
+        '''
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
@@ -0,0 +1,175 @@
+from __future__ import print_function    # (at top of module)
+
+import threading
+import time
+import numpy as np
+from collections import namedtuple
+from gnuradio import gr
+import sources
+from sinks import make_stream_sink
+import modulations
+
+
+"""
+Transmission queue: runs a list of bursts back-to-back on one flowgraph. The graph is started once
+and keeps running for the whole schedule, so the sink (and the USRP device behind it) is opened once;
+between bursts the radio is retuned on the live sink, the burst gate is re-armed with the next length
+and, when the modulation changes, only the modulator is swapped under lock()/unlock(). Modulators are
+kept once built, so revisiting a modulation costs nothing.
+"""
+
+ScheduleEntry = namedtuple("ScheduleEntry", "modulation_type center_freq_hz symbol_rate_Bd gain_dB number_of_symbols")
+
+# when each entry actually ran, for measuring inter-burst gaps, and how many samples it passed
+ScheduleRecord = namedtuple("ScheduleRecord", "entry start_time end_time samples")
+
+
+class burst_gate(gr.sync_block):
+    '''
+    Passes the next armed number of samples, then outputs zeros until armed again; done is set when the
+    armed burst has been handed on. Unlike head it never ends the flowgraph.
+    '''
+
+    def __init__(self):
+        gr.sync_block.__init__(
+            self, name="burst_gate",
+            in_sig=[np.complex64],
+            out_sig=[np.complex64],
+        )
+
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.remaining = 0
+        self.passed = 0     # samples passed since the last arm
+
+    def arm(self, N):
+        with self.lock:
+            self.remaining = N
+            self.passed = 0
+
+            # an empty burst is done straight away
+            if N > 0:
+                self.done.clear()
+            else:
+                self.done.set()
+
+    def work(self, input_items, output_items):
+        in0 = input_items[0]
+        out = output_items[0]
+
+        with self.lock:
+            n = min(len(in0), self.remaining)
+            out[:n] = in0[:n]
+            out[n:] = 0
+
+            if n:
+                self.remaining -= n
+                self.passed += n
+                if self.remaining == 0:
+                    self.done.set()
+
+        return len(out)
+
+
+class transmit_schedule(gr.top_block):
+
+    # class constants
+    antenna = 'TX/RX'
+    payload_size_bytes = 1312   # preamble + random sequence of transmit
+
+    # a burst taking longer than burst_timeout_factor x its air time plus burst_timeout_s has stalled
+    burst_timeout_factor = 2.0
+    burst_timeout_s = 5.0
+
+    def __init__(self, cbp, _tx_id, _first_entry, _samples_per_symbol=2, _excess_bw=0.35, device_ip="192.168.10.2", _sink_type='usrp', _sink_file='tx_samples.c64'):
+
+        gr.top_block.__init__(self, "Schedule Top Block")
+
+        # save input parameters
+        self.cbp = cbp
+        self.frame_id = _tx_id
+        self.samples_per_symbol = _samples_per_symbol
+        self.excess_bw = _excess_bw
+        self.entry = _first_entry
+        self.sample_rate_hz = _first_entry.symbol_rate_Bd * _samples_per_symbol
+        self.modulators = {}
+        self.records = []
+
+        # payload frame shared by every burst
+        self.cbp.write_channel_header(center_frequency_hz=_first_entry.center_freq_hz, sample_rate_hz=self.sample_rate_hz)
+        self.cbp.write_frame(self.frame_id, np.random.randint(0, 256, self.payload_size_bytes).astype(np.uint8), 'b')
+
+        # source -> modulator -> gate -> sink, sink opened once for the whole schedule
+        self.source = sources.shm_bytes(self.cbp, self.frame_id)
+        self.mod = self.modulator(_first_entry.modulation_type, self.sample_rate_hz)
+        self.gate = burst_gate()
+        self.sink = make_stream_sink(_sink_type, _first_entry.center_freq_hz, self.sample_rate_hz, self.antenna,
+                                     _first_entry.gain_dB, device_ip, cbp=self.cbp, sink_file=_sink_file)
+
+        self.connect(self.source, self.mod, self.gate, self.sink)
+
+    def modulator(self, modulation_type, sample_rate_hz):
+
+        # build each modulator once per sample rate (it only matters for PI4QPSK)
+        key = (modulation_type, sample_rate_hz)
+        if key not in self.modulators:
+            self.modulators[key] = modulations.make(modulation_type, self.samples_per_symbol, self.excess_bw, sample_rate_hz)
+        return self.modulators[key]
+
+    def configure(self, entry):
+
+        sample_rate_hz = entry.symbol_rate_Bd * self.samples_per_symbol
+
+        # swap only the modulator, on the running graph
+        mod = self.modulator(entry.modulation_type, sample_rate_hz)
+        if mod is not self.mod:
+            self.lock()
+            self.disconnect(self.source, self.mod)
+            self.disconnect(self.mod, self.gate)
+            self.connect(self.source, mod, self.gate)
+            self.unlock()
+            self.mod = mod
+
+        # retune on the live sink
+        if hasattr(self.sink, 'set_center_freq'):
+            self.sink.set_center_freq(entry.center_freq_hz, 0)
+            self.sink.set_gain(entry.gain_dB, 0)
+            if sample_rate_hz != self.sample_rate_hz:
+                self.sink.set_samp_rate(sample_rate_hz)
+        elif hasattr(self.sink, 'set_sample_rate') and sample_rate_hz != self.sample_rate_hz:
+            self.sink.set_sample_rate(sample_rate_hz)
+
+        self.cbp.update_channel_params(entry.center_freq_hz, sample_rate_hz)
+
+        self.entry = entry
+        self.sample_rate_hz = sample_rate_hz
+
+    def run_schedule(self, entries):
+        '''
+        Transmit each entry in turn on the running graph: configure, arm the gate, wait for the burst
+        :return: ScheduleRecord per entry
+        '''
+        self.start()
+
+        try:
+            for i, entry in enumerate(entries):
+
+                if i > 0 or entry != self.entry:
+                    self.configure(entry)
+
+                N = entry.number_of_symbols * self.samples_per_symbol
+                timeout_s = self.burst_timeout_s + self.burst_timeout_factor * N / self.sample_rate_hz
+
+                start_time = time.time()
+                self.gate.arm(N)
+                if not self.gate.done.wait(timeout_s):
+                    raise RuntimeError('Schedule entry ' + str(i) + ' did not finish within ' + str(round(timeout_s, 1)) +
+                                       ' s (' + str(self.gate.passed) + ' of ' + str(N) + ' samples sent).')
+
+                self.records.append(ScheduleRecord(entry, start_time, time.time(), self.gate.passed))
+
+        finally:
+            self.stop()
+            self.wait()
+
+        return self.records
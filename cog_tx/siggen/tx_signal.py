@@ -1,9 +1,10 @@
-import numpy as np
 from gnuradio import gr
+from gnuradio import blocks
 import sources
-from sinks import usrp_head_sink
+from sinks import make_sink, shm_sink, telemetry_sink
 import modulations
-from cog_tx.mem_manager.shmem import shm_mem
+from frame_builder import frame_builder
+from channel_model import channel
 
 
 class transmit(gr.top_block):
@@ -27,8 +28,10 @@ class transmit(gr.top_block):
 
     # grc graph parameters
     source = None
+    channel = None
+    modulator_backend = None
 
-    def __init__(self, cbp, _tx_id, _center_freq_hz, _symbol_rate_Bd, _modulation_type, _gain_dB, _number_of_symbols, _samples_per_symbol=2, _excess_bw = 0.35, device_ip = "192.168.10.2"):
+    def __init__(self, cbp, _tx_id, _center_freq_hz, _symbol_rate_Bd, _modulation_type, _gain_dB, _number_of_symbols, _samples_per_symbol=2, _excess_bw = 0.35, device_ip = "192.168.10.2", _tap_samples=False, _waveform_cache=None, _payload_seed=None, _sink_type='usrp', _sink_file='tx_samples.c64', _tx_log=None, _channel=None):
 
         gr.top_block.__init__(self, "Top Block")
 
@@ -55,17 +58,24 @@ class transmit(gr.top_block):
         total_bits_to_transmit = self.number_of_symbols * bits_per_symbol
         number_of_times_burst_vector_is_repeated = float(total_bits_to_transmit) / float(self.random_sequence_size_bits + self.preamble_size_bits)
 
-        # source block  (0-255 represents 8 random bits (1 byte)
-        preamble = map(int, np.random.randint(0, 255, int(self.preamble_size_bits/8.0)))
-        data = map(int, np.random.randint(0, 255, int(self.random_sequence_size_bits/8.0)))
-        #data = map(int, np.random.randint(0, 255, int((total_bits_to_transmit-self.preamble_size_bits)/8.0) ))
-        burst_vector = preamble+data
+        # precomputed burst when a cache and a reproducible payload are available
+        use_cache = _waveform_cache is not None and _payload_seed is not None and _waveform_cache.supports(self.modulation_type)
+
+        builder = frame_builder(self.cbp, seed=_payload_seed, preamble_size_bits=self.preamble_size_bits, random_sequence_size_bits=self.random_sequence_size_bits)
         samples_to_tx = self.number_of_symbols * self.samples_per_symbol
 
-        # save in shared mem
+        # save in shared mem: burst (preamble + data, full-byte random) is generated straight into its frame
         self.cbp.write_channel_header(center_frequency_hz = self.center_freq_hz, sample_rate_hz=self.sample_rate_hz)
-        self.cbp.write_frame_header(self.frame_id, len(burst_vector), 'i', number_of_times_burst_vector_is_repeated, len(preamble))
-        self.cbp.write_int32_vector(burst_vector)
+
+        if use_cache:
+            cached = _waveform_cache.get(self.modulation_type, self.samples_per_symbol, self.excess_bw, _payload_seed, builder.burst_size_bytes)
+            use_cache = cached is not None
+
+        if use_cache:
+            payload, burst_samples = cached
+            burst = builder.build(self.frame_id, number_of_times_burst_vector_is_repeated, payload)
+        else:
+            burst = builder.build(self.frame_id, number_of_times_burst_vector_is_repeated)
 
         # read from shared memory
 
@@ -79,7 +89,7 @@ class transmit(gr.top_block):
         print ('---- [Sample Rate (Ksps] ', channel_header.sample_rate_hz/1e3)
 
         # read frame info
-        frame_index = 0+ self.cbp.channel_header_size_bytes
+        frame_index = self.cbp.find_frame_index(self.frame_id)
         frame_header =  self.cbp.read_frame_header(frame_index)
         print ('[Frame Info]')
         print ('---- [Frame ID] ', frame_header.frame_id)
@@ -89,55 +99,78 @@ class transmit(gr.top_block):
         print ('---- [Number of Instances] ', frame_header.number_of_instances)
         print ('---- [Preamble Length] ', frame_header.preamble_length)
 
-        # read frame data
-        rdata = self.cbp.read_int32_vector(frame_header.length, frame_header.data_index)
+        # frame table and header must describe the burst that was built in place
+        assert frame_index == burst.frame_index and frame_header.length == len(burst.burst)
 
-        assert np.array_equal(rdata,burst_vector)
+        if use_cache:
 
-        # source block with burst vector as sequence
-        self.source = sources.bytes(burst_vector)
+            # source block repeating the already modulated burst
+            print('Using modulation: ' + self.modulation_type + ' (cached ' + _waveform_cache.backend + ' waveform)')
+            self.source = sources.samples(burst_samples)
+            self.mod = None
+            self.modulator_backend = _waveform_cache.backend
 
-        # modulation block
-        self.mod = self.parse_mod_type(self.modulation_type)
+        else:
 
-        # sink block
-        self.sink = usrp_head_sink(center_freq_hz=self.center_freq_hz, sample_rate_hz=self.sample_rate_hz, antenna=self.antenna, gain_dB=self.gain_dB, ipv4_address=self.usrp_device_ip, N=samples_to_tx)
+            # source block streaming the burst vector straight from its shared memory frame
+            self.source = sources.shm_bytes(self.cbp, self.frame_id)
 
-        # connect
-        self.connect(self.source, self.mod, self.sink)
+            # modulation block
+            self.mod = self.parse_mod_type(self.modulation_type)
+            self.modulator_backend = 'gnuradio'
 
-        file = open('test_output', 'w')
-        file.write("[Channel Info] \n")
-        file.write('---- [Channel ID] ' + str(channel_header.channel_id) + '\n')
-        file.write('---- [Active Pointer] '+ str(channel_header.active_pointer) + '\n')
-        file.write('---- [Source] '+ str(channel_header.source) + '\n')
-        file.write('---- [Center Freq (MHz)] '+ str(channel_header.center_freq_hz / 1e6) + '\n')
-        file.write('---- [Sample Rate (Ksps] '+ str(channel_header.sample_rate_hz / 1e3)+ '\n')
-
-        file.write('[Frame Info] \n')
-        file.write('---- [Frame ID] ' +  str(frame_header.frame_id) + '\n')
-        file.write('---- [Frame Index] '+ str(frame_index) + '\n')
-        file.write('---- [Length] '+ str(frame_header.length) + '\n')
-        file.write('---- [Type] '+ str(frame_header.type) + '\n')
-        file.write('---- [Number of Instances] '+ str(frame_header.number_of_instances) + '\n')
-        file.write('---- [Preamble Length] ' +str(frame_header.preamble_length) + '\n')
-
-        file.write('\n [Preamble] \n')
-        file.write(preamble.__str__())
+        # sink block
+        self.sink = make_sink(_sink_type, samples_to_tx, center_freq_hz=self.center_freq_hz, sample_rate_hz=self.sample_rate_hz, antenna=self.antenna,
+                              gain_dB=self.gain_dB, ipv4_address=self.usrp_device_ip, cbp=self.cbp, sink_file=_sink_file)
 
-        file.write('\n [Burst Data] \n')
-        file.write(data.__str__())
-        file.close()
+        # optional channel impairments (ChannelParams) ahead of the sink, changed per burst with set_channel
+        if _channel is not None:
+            self.channel = channel(_channel, self.sample_rate_hz, self.samples_per_symbol)
 
+        # connect
+        chain = [block for block in (self.source, self.mod, self.channel) if block is not None]
+        self.connect(*(chain + [self.sink]))
+
+        # counters for the GUI / external monitors, in the channel header's telemetry area
+        self.telemetry = telemetry_sink(self.cbp, samples_to_tx)
+        self.connect(chain[-1], self.telemetry)
+
+        usrp = getattr(self.sink, 'usrp', None)
+        if usrp is not None:
+            self.msg_connect((usrp, 'async_msgs'), (self.telemetry, 'async_msgs'))
+
+        # optionally stream the transmitted samples into the channel's ring buffer for co-located consumers
+        # (behind its own head: the ring sink never finishes, the graph must still end with the transmission)
+        if _tap_samples:
+            self.tap_head = blocks.head(gr.sizeof_gr_complex * 1, samples_to_tx)
+            self.tap = shm_sink(self.cbp)
+            self.connect(chain[-1], self.tap_head, self.tap)
+
+        # transmit record, written by the log's background thread
+        if _tx_log is not None:
+            _tx_log.log_transmit(parameters={'modulation_type': self.modulation_type,
+                                             'center_freq_hz': self.center_freq_hz,
+                                             'symbol_rate_Bd': self.symbol_rate_Bd,
+                                             'gain_dB': self.gain_dB,
+                                             'number_of_symbols': self.number_of_symbols,
+                                             'samples_per_symbol': self.samples_per_symbol,
+                                             'excess_bw': self.excess_bw,
+                                             'payload_seed': _payload_seed,
+                                             'modulator_backend': self.modulator_backend,
+                                             'sink_type': _sink_type},
+                                 channel_header=channel_header,
+                                 frame_header=frame_header,
+                                 frame_index=frame_index,
+                                 payload=burst.burst)
+
+
+    def set_channel(self, params):
+        '''
+        New impairments on the running flowgraph, only when built with _channel
+        '''
+        assert self.channel is not None, 'Transmitter was built without a channel model.'
+        self.channel.set_params(params)
 
     def parse_mod_type(self, modulation_type):
         print('Using modulation: ' + modulation_type)
-        return {
-            'BPSK': modulations.bpsk(self.samples_per_symbol, self.excess_bw),
-            'QPSK': modulations.qpsk(self.samples_per_symbol, self.excess_bw),
-            '8PSK': modulations.psk8(self.samples_per_symbol, self.excess_bw),
-            '16PSK': modulations.psk16(self.samples_per_symbol, self.excess_bw),
-            'QAM16': modulations.qam16(self.samples_per_symbol, self.excess_bw),
-            'PI4QPSK': modulations.Pi4DQPSKMod(self.sample_rate_hz, self.samples_per_symbol, self.excess_bw),
-            'GMSK': modulations.gmsk(self.samples_per_symbol, self.excess_bw),
-        }[modulation_type]
\ No newline at end of file
+        return modulations.make(modulation_type, self.samples_per_symbol, self.excess_bw, self.sample_rate_hz)
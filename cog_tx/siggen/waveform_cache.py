@@ -0,0 +1,90 @@
+from collections import OrderedDict
+import np_modulations
+from frame_builder import frame_builder
+
+
+"""
+Bounded LRU cache of modulated bursts. Bursts are generated once with the NumPy modulator backend
+from a seeded payload and kept as complex64 arrays, so repeating a transmission with the same
+(modulation, sps, excess_bw, seed, length) costs no modulation CPU.
+
+Bursts are modulated circularly (np_modulations.modulate_periodic): the cached samples are the
+steady-state waveform of the payload repeated forever, so looping them has no filter transient or
+phase jump at the seam. Modulations whose phase cannot be closed that way are not cached.
+"""
+
+
+class waveform_cache(object):
+
+    # memory ceiling for cached samples (payloads are small next to them and are not counted)
+    max_bytes = 256 * 1024 * 1024
+
+    # statistics
+    hits = 0
+    misses = 0
+    evictions = 0
+
+    # name recorded with transmissions that use cached samples instead of the GNU Radio modulator
+    backend = 'numpy_periodic'
+
+    def __init__(self, max_bytes=None):
+
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+
+        self.entries = OrderedDict()
+        self.size_bytes = 0
+
+    @staticmethod
+    def supports(modulation_type):
+        return modulation_type in np_modulations.modulators
+
+    @staticmethod
+    def payload(seed, length):
+        '''
+        Reproducible full-byte payload (0-255 inclusive), the same bytes frame_builder writes for the seed
+        '''
+        return frame_builder.payload(seed, length)
+
+    def get(self, modulation_type, sps, excess_bw, seed, length):
+        '''
+        :return: (payload, samples) for the given parameters, modulating only on a miss;
+                 None when the burst cannot be looped seamlessly (use the GNU Radio modulator instead)
+        '''
+        key = (modulation_type, int(sps), float(excess_bw), seed, int(length))
+
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.hits += 1
+            self.entries[key] = entry
+            return entry
+
+        self.misses += 1
+        payload = self.payload(seed, length)
+        try:
+            samples = np_modulations.modulate_periodic(modulation_type, payload, sps, excess_bw)
+        except ValueError as e:
+            print('Not caching ' + modulation_type + ' burst: ' + str(e))
+            return None
+        samples.setflags(write=False)
+        entry = (payload, samples)
+
+        # bursts bigger than the whole cache are returned but not kept
+        if samples.nbytes <= self.max_bytes:
+            self.entries[key] = entry
+            self.size_bytes += samples.nbytes
+            self.evict()
+
+        return entry
+
+    def evict(self):
+
+        # drop least recently used bursts until under the ceiling
+        while self.size_bytes > self.max_bytes and self.entries:
+            key, (payload, samples) = self.entries.popitem(last=False)
+            self.size_bytes -= samples.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.size_bytes = 0
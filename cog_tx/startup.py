@@ -0,0 +1,35 @@
+from __future__ import print_function    # (at top of module)
+
+import time
+
+
+"""
+Startup timing. __main__ imports this first and marks each phase (Qt import, window import, window
+shown, GNU Radio loaded in the background); run with --startup-report to print the breakdown. The
+benchmark's startup suite runs python -m cog_tx --startup-json, which prints the phases as JSON and exits
+once the background load is done.
+"""
+
+start_time = time.time()
+
+# (phase, seconds since start_time)
+phases = []
+
+# print the report once the background GNU Radio load finishes
+verbose = False
+
+
+def mark(phase):
+    phases.append((phase, time.time() - start_time))
+
+
+def report():
+    '''
+    :return: one line per phase, total and delta to the previous phase, in ms
+    '''
+    lines = ['[Startup]']
+    previous = 0.0
+    for phase, seconds in list(phases):
+        lines.append('---- [{0}] {1:8.1f} ms  (+{2:.1f} ms)'.format(phase, seconds * 1e3, (seconds - previous) * 1e3))
+        previous = seconds
+    return '\n'.join(lines)
@@ -15,7 +15,7 @@ class Ui_MainWindow(object):
         self.centralwidget = QtWidgets.QWidget(MainWindow)
         self.centralwidget.setObjectName("centralwidget")
         self.gridLayoutWidget = QtWidgets.QWidget(self.centralwidget)
-        self.gridLayoutWidget.setGeometry(QtCore.QRect(190, 80, 391, 291))
+        self.gridLayoutWidget.setGeometry(QtCore.QRect(190, 20, 391, 411))
         self.gridLayoutWidget.setObjectName("gridLayoutWidget")
         self.gridLayout = QtWidgets.QGridLayout(self.gridLayoutWidget)
         self.gridLayout.setObjectName("gridLayout")
@@ -61,6 +61,25 @@ class Ui_MainWindow(object):
         self.filter_excess_bw_SpinBox = QtWidgets.QDoubleSpinBox(self.gridLayoutWidget)
         self.filter_excess_bw_SpinBox.setObjectName("filter_excess_bw_SpinBox")
         self.gridLayout.addWidget(self.filter_excess_bw_SpinBox, 5, 1, 1, 1)
+        self.payload_seed_label = QtWidgets.QLabel(self.gridLayoutWidget)
+        self.payload_seed_label.setObjectName("payload_seed_label")
+        self.gridLayout.addWidget(self.payload_seed_label, 7, 0, 1, 1)
+        self.payload_seed_spinBox = QtWidgets.QSpinBox(self.gridLayoutWidget)
+        self.payload_seed_spinBox.setObjectName("payload_seed_spinBox")
+        self.gridLayout.addWidget(self.payload_seed_spinBox, 7, 1, 1, 1)
+        self.sink_label = QtWidgets.QLabel(self.gridLayoutWidget)
+        self.sink_label.setObjectName("sink_label")
+        self.gridLayout.addWidget(self.sink_label, 8, 0, 1, 1)
+        self.sink_comboBox = QtWidgets.QComboBox(self.gridLayoutWidget)
+        self.sink_comboBox.setObjectName("sink_comboBox")
+        self.gridLayout.addWidget(self.sink_comboBox, 8, 1, 1, 1)
+        self.telemetry_label = QtWidgets.QLabel(self.gridLayoutWidget)
+        self.telemetry_label.setObjectName("telemetry_label")
+        self.gridLayout.addWidget(self.telemetry_label, 9, 0, 1, 1)
+        self.telemetry_value_label = QtWidgets.QLabel(self.gridLayoutWidget)
+        self.telemetry_value_label.setWordWrap(True)
+        self.telemetry_value_label.setObjectName("telemetry_value_label")
+        self.gridLayout.addWidget(self.telemetry_value_label, 9, 1, 1, 1)
         self.gridLayoutWidget_2 = QtWidgets.QWidget(self.centralwidget)
         self.gridLayoutWidget_2.setGeometry(QtCore.QRect(495, 439, 171, 71))
         self.gridLayoutWidget_2.setObjectName("gridLayoutWidget_2")
@@ -104,6 +123,10 @@ class Ui_MainWindow(object):
         self.label_4.setText(_translate("MainWindow", "Number of Symbols"))
         self.label_6.setText(_translate("MainWindow", "Gain (dB)"))
         self.label_7.setText(_translate("MainWindow", "Filter Excess BW (β)"))
+        self.payload_seed_label.setText(_translate("MainWindow", "Payload Seed"))
+        self.sink_label.setText(_translate("MainWindow", "Sink"))
+        self.telemetry_label.setText(_translate("MainWindow", "Telemetry"))
+        self.telemetry_value_label.setText(_translate("MainWindow", "idle"))
         self.transmit_button.setText(_translate("MainWindow", "Transmit"))
         self.menuFile.setTitle(_translate("MainWindow", "File"))
         self.actionExit.setText(_translate("MainWindow", "Exit"))
@@ -1,17 +1,27 @@
+from __future__ import print_function    # (at top of module)
+
+import threading
 from PyQt5 import QtWidgets
-from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QObject, QThread, QMetaObject, QTimer, Qt, pyqtSignal
 
+from cog_tx import startup
 from cog_tx.ui.ui_mainwindow import Ui_MainWindow
-from cog_tx.siggen.tx_signal import transmit
-from cog_tx.mem_manager.shmem import shm_mem
+from cog_tx.siggen.waveform_cache import waveform_cache
+from cog_tx.siggen import modulations
+from cog_tx.siggen.sink_names import sink_types
+from cog_tx.siggen.tx_log import tx_log
+from cog_tx.ui_classes.transmit_worker import TransmitWorker
 
 
 class CogTransmit_MainWindow(QtWidgets.QMainWindow, Ui_MainWindow, QObject):
 
+    # requests to the transmit worker (queued onto its thread)
+    start_requested = pyqtSignal(dict)
+    stop_requested = pyqtSignal()
+
     # class members
     window = None
-    transmit_button_state = False
-    transmitter = None
+    transmit_state = TransmitWorker.IDLE
     tx_center_freq_hz = 0.0
     tx_symbol_rate_bd = 0.0
     tx_modulation_type = None
@@ -20,6 +30,11 @@ class CogTransmit_MainWindow(QtWidgets.QMainWindow, Ui_MainWindow, QObject):
     gain = 0
     filter_bw = 0.0
     usrp_ip = None
+    payload_seed = None
+    sink_type = 'usrp'
+    preload_thread = None
+    telemetry_interval_ms = 250
+    telemetry_read_timeout_s = 0.005
     parent = None
 
     def __init__(self, parent=None):
@@ -28,8 +43,11 @@ class CogTransmit_MainWindow(QtWidgets.QMainWindow, Ui_MainWindow, QObject):
 
         self.parent = parent
 
-        # init shared memory
-        self.cbp = shm_mem(channel_id=0, write_permissions=True)
+        # modulated bursts reused across transmissions with a fixed payload seed
+        self.waveform_cache = waveform_cache()
+
+        # transmit history, appended in the background
+        self.tx_log = tx_log()
 
         # setup ui
         self.setupUi(self)
@@ -37,12 +55,48 @@ class CogTransmit_MainWindow(QtWidgets.QMainWindow, Ui_MainWindow, QObject):
         # configure input fields
         self.setupInputField()
 
+        # transmit setup and teardown run on the worker thread
+        self.worker_thread = QThread()
+        self.worker = TransmitWorker(self.tx_log, self.waveform_cache)
+        self.worker.moveToThread(self.worker_thread)
+
+        self.start_requested.connect(self.worker.start_transmit)
+        self.stop_requested.connect(self.worker.stop_transmit)
+        self.worker.state_changed.connect(self.on_transmit_state_changed)
+        self.worker.progress.connect(self.statusbar.showMessage)
+        self.worker.error.connect(self.on_transmit_error)
+
+        self.worker_thread.start()
+
         # connect buttons
         self.transmit_button.clicked.connect(self.on_transmitButton_Clicked)
 
+        # low rate poll of the counters the flowgraph publishes in shared memory
+        self.telemetry_timer = QTimer(self)
+        self.telemetry_timer.timeout.connect(self.update_telemetry)
+        self.telemetry_timer.start(self.telemetry_interval_ms)
+
         # show ui
         self.show()
 
+        # load GNU Radio / UHD (through tx_signal) while the window is up instead of before it
+        self.preload_thread = threading.Thread(target=self.preload_transmit, name='preload_transmit')
+        self.preload_thread.daemon = True
+        self.preload_thread.start()
+
+    def preload_transmit(self):
+
+        try:
+            import cog_tx.siggen.tx_signal
+            startup.mark('gnuradio_loaded')
+        except ImportError as e:
+            print('---- GNU Radio not available: ' + str(e))
+            startup.mark('gnuradio_unavailable')
+
+        if startup.verbose:
+            print(startup.report())
+
+
 
     def setupInputField(self):
 
@@ -71,13 +125,8 @@ class CogTransmit_MainWindow(QtWidgets.QMainWindow, Ui_MainWindow, QObject):
         self.number_of_symbols_spinBox.setValue(200000)
 
         # modulation choices
-        self.modulation_comboBox.addItem("BPSK")
-        self.modulation_comboBox.addItem("QPSK")
-        self.modulation_comboBox.addItem("8PSK")
-        self.modulation_comboBox.addItem("16PSK")
-        self.modulation_comboBox.addItem("QAM16")
-        self.modulation_comboBox.addItem("PI4QPSK")
-        self.modulation_comboBox.addItem("GMSK")
+        for modulation_type in modulations.mod_types['discrete']:
+            self.modulation_comboBox.addItem(modulation_type)
 
         # RRC Filter Excess Bandwidth (Beta)
         self.filter_excess_bw_SpinBox.setMinimum(0)
@@ -88,20 +137,67 @@ class CogTransmit_MainWindow(QtWidgets.QMainWindow, Ui_MainWindow, QObject):
         # USRP Device IPv4 Address
         self.device_ip_lineEdit.setText("192.168.10.2")
 
+        # Payload seed (-1 = new random payload each transmission, otherwise cached burst)
+        self.payload_seed_spinBox.setMinimum(-1)
+        self.payload_seed_spinBox.setMaximum(2147483647)
+        self.payload_seed_spinBox.setSingleStep(1)
+        self.payload_seed_spinBox.setValue(-1)
 
-    def on_transmitButton_Clicked(self):
+        # Sink backend (usrp for the radio, the others run without hardware)
+        for sink_type in sink_types:
+            self.sink_comboBox.addItem(sink_type)
 
-        # toggle state
-        self.transmit_button_state = not self.transmit_button_state
 
-        # update button text
-        if self.transmit_button_state:
-            self.transmit_button.setText("Halt")
+    def on_transmitButton_Clicked(self):
+
+        # the button is disabled while starting / stopping
+        if self.transmit_state == TransmitWorker.IDLE:
             self.start_transmit()
-        else:
-            self.transmit_button.setText("Transmit")
+        elif self.transmit_state == TransmitWorker.TRANSMITTING:
             self.stop_transmit()
 
+    def on_transmit_state_changed(self, state):
+
+        self.transmit_state = state
+
+        # button follows the transmitter, including when a transmission ends by itself
+        if state == TransmitWorker.IDLE:
+            self.transmit_button.setText("Transmit")
+        elif state == TransmitWorker.STARTING:
+            self.transmit_button.setText("Starting...")
+        elif state == TransmitWorker.TRANSMITTING:
+            self.transmit_button.setText("Halt")
+        elif state == TransmitWorker.STOPPING:
+            self.transmit_button.setText("Halting...")
+
+        self.transmit_button.setEnabled(state in (TransmitWorker.IDLE, TransmitWorker.TRANSMITTING))
+
+    def on_transmit_error(self, message):
+
+        self.statusbar.showMessage('Transmit failed: ' + message)
+        QtWidgets.QMessageBox.warning(self, 'Transmit failed', message)
+
+    def update_telemetry(self):
+
+        # nothing to show until the worker has created the segment
+        cbp = self.worker.cbp
+        if cbp is None:
+            return
+
+        # runs on the gui thread: a writer mid-update just skips this tick, the next one catches up
+        try:
+            telemetry = cbp.read_telemetry(self.telemetry_read_timeout_s)
+            channel_header = cbp.read_channel_header(self.telemetry_read_timeout_s)
+        except RuntimeError:
+            return
+
+        elapsed_s = max(telemetry.update_time - telemetry.start_time, 0.0) if telemetry.start_time else 0.0
+        rate_ksps = telemetry.samples_produced / elapsed_s / 1e3 if elapsed_s > 0 else 0.0
+        shm_used = float(channel_header.active_pointer) / cbp.buffer_size
+
+        self.telemetry_value_label.setText('{0}: {1} samples, {2:.1f} s, {3:.1f} ksps, {4} underruns, shm {5:.1%}'.format(
+            telemetry.state, telemetry.samples_produced, elapsed_s, rate_ksps, telemetry.underruns, shm_used))
+
     def get_ui_values(self):
 
         self.tx_center_freq_hz = self.center_frequency_mhz_spinBox.value() * 1e6
@@ -111,13 +207,25 @@ class CogTransmit_MainWindow(QtWidgets.QMainWindow, Ui_MainWindow, QObject):
         self.gain = self.gain_spinBox.value()
         self.filter_bw = self.filter_excess_bw_SpinBox.value()
         self.usrp_ip = self.device_ip_lineEdit.text()
+        self.payload_seed = self.payload_seed_spinBox.value() if self.payload_seed_spinBox.value() >= 0 else None
+        self.sink_type = self.sink_comboBox.currentText()
 
     def stop_transmit(self):
 
         print('Halting Transmit')
 
-        if self.transmitter is not None:
-            self.transmitter.stop()
+        self.stop_requested.emit()
+
+    def closeEvent(self, event):
+
+        # halt any transmission (waits for the worker to finish it), then stop the worker thread
+        QMetaObject.invokeMethod(self.worker, 'stop_transmit', Qt.BlockingQueuedConnection)
+        self.worker_thread.quit()
+        self.worker_thread.wait()
+
+        # write out any queued transmit records before exiting
+        self.tx_log.close()
+        event.accept()
 
 
     def start_transmit(self):
@@ -129,8 +237,5 @@ class CogTransmit_MainWindow(QtWidgets.QMainWindow, Ui_MainWindow, QObject):
         # increment number of transmissions
         self.transmission_count += 1
 
-        # transmit the user selected signal
-        self.transmitter = transmit(self.cbp, _tx_id=self.transmission_count, _center_freq_hz=self.tx_center_freq_hz, _symbol_rate_Bd=self.tx_symbol_rate_bd, _modulation_type=self.tx_modulation_type, _gain_dB=self.gain, _number_of_symbols=self.tx_number_of_symbols, _samples_per_symbol=2, _excess_bw = self.filter_bw, device_ip = self.usrp_ip)
-
-        self.transmitter.start()
-
+        # transmit the user selected signal, built and started on the worker thread
+        self.start_requested.emit(dict(_tx_id=self.transmission_count, _center_freq_hz=self.tx_center_freq_hz, _symbol_rate_Bd=self.tx_symbol_rate_bd, _modulation_type=self.tx_modulation_type, _gain_dB=self.gain, _number_of_symbols=self.tx_number_of_symbols, _samples_per_symbol=2, _excess_bw = self.filter_bw, device_ip = self.usrp_ip, _payload_seed=self.payload_seed, _sink_type=self.sink_type))
@@ -0,0 +1,120 @@
+from __future__ import print_function    # (at top of module)
+
+import threading
+import traceback
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from cog_tx.mem_manager.shmem import shm_mem
+
+
+class TransmitWorker(QObject):
+    '''
+    Builds, starts and stops the transmit flowgraph on its own QThread so the window never blocks on
+    GNU Radio imports, shared memory writes or opening the USRP. The window talks to it only through
+    queued signals; state_changed reports the real transmitter state.
+    '''
+
+    # transmitter states
+    IDLE = 'idle'
+    STARTING = 'starting'
+    TRANSMITTING = 'transmitting'
+    STOPPING = 'stopping'
+
+    state_changed = pyqtSignal(str)
+    progress = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    # emitted from the completion thread, handled on the worker thread
+    completed = pyqtSignal(object)
+
+    # class members
+    transmitter = None
+    cbp = None
+
+    def __init__(self, tx_log, waveform_cache):
+
+        super(TransmitWorker, self).__init__()
+
+        self.tx_log = tx_log
+        self.waveform_cache = waveform_cache
+
+        self.completed.connect(self.on_completed)
+
+    def shared_memory(self):
+
+        # segment is created on first transmit, not at startup
+        if self.cbp is None:
+            self.cbp = shm_mem(channel_id=0, write_permissions=True)
+
+        return self.cbp
+
+    @pyqtSlot(dict)
+    def start_transmit(self, settings):
+        '''
+        :param settings: transmit() keyword arguments, without the shared memory and log
+        '''
+        if self.transmitter is not None:
+            return
+
+        self.state_changed.emit(self.STARTING)
+
+        try:
+            # already loaded by the window's preload thread, or waits for it to finish
+            self.progress.emit('Loading GNU Radio')
+            from cog_tx.siggen.tx_signal import transmit
+
+            self.progress.emit('Building flowgraph')
+            transmitter = transmit(self.shared_memory(), _waveform_cache=self.waveform_cache, _tx_log=self.tx_log, **settings)
+
+            self.progress.emit('Starting flowgraph')
+            transmitter.start()
+
+        except Exception as e:
+            traceback.print_exc()
+            self.error.emit(str(e))
+            self.state_changed.emit(self.IDLE)
+            return
+
+        self.transmitter = transmitter
+        self.state_changed.emit(self.TRANSMITTING)
+        self.progress.emit('Transmitting')
+
+        # the flowgraph ends by itself when the sink's head block is done
+        waiter = threading.Thread(target=self.wait_for_completion, args=(transmitter,), name='transmit_wait')
+        waiter.daemon = True
+        waiter.start()
+
+    def wait_for_completion(self, transmitter):
+        transmitter.wait()
+        self.completed.emit(transmitter)
+
+    @pyqtSlot(object)
+    def on_completed(self, transmitter):
+
+        # a halted transmitter has already been reported by stop_transmit
+        if transmitter is not self.transmitter:
+            return
+
+        self.transmitter = None
+        self.state_changed.emit(self.IDLE)
+        self.progress.emit('Transmission complete')
+
+    @pyqtSlot()
+    def stop_transmit(self):
+
+        if self.transmitter is None:
+            return
+
+        self.state_changed.emit(self.STOPPING)
+        self.progress.emit('Halting')
+
+        try:
+            self.transmitter.stop()
+            self.transmitter.wait()
+        except Exception as e:
+            traceback.print_exc()
+            self.error.emit(str(e))
+
+        self.transmitter = None
+        self.state_changed.emit(self.IDLE)
+        self.progress.emit('Halted')
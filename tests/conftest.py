@@ -0,0 +1,5 @@
+import os
+import sys
+
+# siggen modules import their siblings by bare name (sinks, sources, modulations, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cog_tx', 'siggen'))
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from cog_tx.mem_manager.shmem import shm_mem
+from frame_builder import frame_builder
+
+
+test_channel_id = 9997
+
+
+@pytest.fixture
+def cbp():
+    cbp = shm_mem(test_channel_id, write_permissions=True, buffer_size=1024 * 1024)
+    cbp.write_channel_header(center_frequency_hz=900e6, sample_rate_hz=200e3)
+    yield cbp
+    os.remove(cbp.path + str(test_channel_id))
+
+
+def test_burst_frame_index_is_aligned_header(cbp):
+    builder = frame_builder(cbp, seed=1, preamble_size_bits=40, random_sequence_size_bits=960)
+
+    for frame_id in range(4):
+        # another writer left the active pointer unaligned, allocate_frame pads before the header
+        cbp.move_active_pointer(3)
+        burst = builder.build(frame_id, 1)
+        frame_header = cbp.read_frame_header(burst.frame_index)
+
+        assert burst.frame_index == cbp.find_frame_index(frame_id)
+        assert burst.frame_index % cbp.frame_alignment_bytes == 0
+        assert frame_header.length == len(burst.burst)
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip('gnuradio.gr')
+pmt = pytest.importorskip('pmt')
+
+from sinks import telemetry_sink
+
+
+def async_msg(event_code, paired=True):
+    metadata = pmt.make_dict()
+    metadata = pmt.dict_add(metadata, pmt.intern('channel'), pmt.from_long(0))
+    metadata = pmt.dict_add(metadata, pmt.intern('event_code'), event_code)
+
+    # newer gr-uhd sends (uhd_async_msg . dict), older ones the bare dict
+    return pmt.cons(pmt.intern('uhd_async_msg'), metadata) if paired else metadata
+
+
+@pytest.mark.parametrize('paired', [True, False])
+def test_underflow_codes_count_as_underruns(paired):
+    sink = telemetry_sink(None)
+
+    sink.handle_async_msg(async_msg(pmt.from_long(0x10), paired))
+    sink.handle_async_msg(async_msg(pmt.from_long(0x2), paired))
+    assert sink.underruns == 2
+
+    # sequence error and burst ack are not underruns
+    sink.handle_async_msg(async_msg(pmt.from_long(0x4), paired))
+    sink.handle_async_msg(async_msg(pmt.from_long(0x1), paired))
+    assert sink.underruns == 2
+
+
+def test_underflow_symbols_count_as_underruns():
+    sink = telemetry_sink(None)
+
+    sink.handle_async_msg(async_msg(pmt.list1(pmt.intern('underflow'))))
+    sink.handle_async_msg(async_msg(pmt.list2(pmt.intern('burst_ack'), pmt.intern('underflow_in_packet'))))
+    assert sink.underruns == 2
+
+    sink.handle_async_msg(async_msg(pmt.list1(pmt.intern('seq_error'))))
+    sink.handle_async_msg(pmt.intern('not_a_dict'))
+    assert sink.underruns == 2
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+pytest.importorskip('gnuradio.gr')
+
+from cog_tx.mem_manager.shmem import shm_mem
+from tx_schedule import transmit_schedule, ScheduleEntry
+
+
+test_channel_id = 9998
+
+
+@pytest.fixture
+def cbp():
+    cbp = shm_mem(test_channel_id, write_permissions=True, buffer_size=4 * 1024 * 1024)
+    yield cbp
+    os.remove(cbp.path + str(test_channel_id))
+
+
+def test_schedule_into_null_sink(cbp):
+    entries = [ScheduleEntry('BPSK', 900e6, 200e3, 10, 5000),
+               ScheduleEntry('QPSK', 901e6, 100e3, 10, 0),
+               ScheduleEntry('QAM16', 902e6, 100e3, 10, 12000)]
+
+    schedule = transmit_schedule(cbp, 1, entries[0], _samples_per_symbol=2, _sink_type='null')
+    records = schedule.run_schedule(entries)
+
+    # every entry ran, in order, with exactly its own number of samples
+    assert [record.entry for record in records] == entries
+    assert [record.samples for record in records] == [entry.number_of_symbols * 2 for entry in entries]
+
+    # the sink saw at least every burst (plus the gate's zeros in between)
+    assert schedule.sink.items_received >= sum(entry.number_of_symbols * 2 for entry in entries)
+
+    # last entry's tuning is published in the channel header
+    header = cbp.read_channel_header()
+    assert header.center_freq_hz == 902e6 and header.sample_rate_hz == 200e3
+
+
+def test_stalled_burst_times_out(cbp):
+    # far more samples than can pass before an immediate timeout
+    entry = ScheduleEntry('BPSK', 900e6, 200e3, 10, 10 ** 9)
+
+    schedule = transmit_schedule(cbp, 1, entry, _samples_per_symbol=2, _sink_type='null')
+    schedule.burst_timeout_s = 0.0
+    schedule.burst_timeout_factor = 0.0
+
+    with pytest.raises(RuntimeError):
+        schedule.run_schedule([entry])